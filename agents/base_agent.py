@@ -68,6 +68,7 @@ class CostTracker:
         self.total_cost = 0.0
         self.calls_by_model = {}
         self.calls_by_agent = {}
+        self.version = 0  # Bumped on every tracked call (for cache invalidation)
 
     def track_call(
         self, model: str, input_tokens: int, output_tokens: int, agent_name: str
@@ -85,6 +86,7 @@ class CostTracker:
         )
 
         self.total_cost += cost
+        self.version += 1
 
         # Track by model
         if model not in self.calls_by_model:
@@ -389,6 +391,12 @@ Return JSON: {{
         """Notify listeners about reflection"""
         return self.on_reflection is not None
 
+    def reset(self):
+        """Clear per-task state so the agent can be reused (learned knowledge is kept)"""
+        self.status = AgentStatus.IDLE
+        self.attempts = []
+        self.current_attempt = None
+
     def get_total_cost(self) -> float:
         """Get total cost of all attempts"""
         return sum(a.total_cost for a in self.attempts)
@@ -174,11 +174,11 @@ Requirements:
 1. Create a Python class called `{portal_name.title().replace('_', '')}FormFiller`
 2. Use async Playwright for browser automation
 3. Include methods:
-   - `__init__(self, headless=True)`: Initialize browser
-   - `async start(self)`: Start browser session
-   - `async fill_form(self, data: dict)`: Fill the form with provided data
+   - `__init__(self, headless=True, browser=None)`: Initialize browser settings
+   - `async start(self)`: Start browser session (if a Playwright `browser` was passed in, reuse it and only open a new context)
+   - `async fill_form(self, data: dict)`: Fill the form with provided data, recording names of fields that could not be filled in `self.fields_failed` (a list, empty when all succeeded)
    - `async submit(self)`: Submit the form (optional, controlled by parameter)
-   - `async close(self)`: Close browser
+   - `async close(self)`: Close browser (only the own context when the browser was passed in)
    - `async run(self, data: dict, submit=False)`: Main entry point
 
 4. For each field type, use appropriate Playwright methods:
@@ -202,6 +202,8 @@ Requirements:
 
 8. Add docstrings and type hints
 
+9. Declare `__all__ = ["{portal_name.title().replace('_', '')}FormFiller"]` at module level
+
 Generate ONLY the Python code, no explanations. The code should be complete and runnable."""
 
         response = self.anthropic_client.messages.create(
@@ -783,11 +783,12 @@ Requirements:
 2. Use the EXACT dropdown pattern above (it works!)
 3. Handle cascading dropdowns - wait 1 second after parent selection before filling child
 4. CRITICAL: DO NOT include fields where "visible": false in the JSON structure. These are hidden fields that should NOT be filled. Only generate code for fields where visible is true or not specified.
-5. Methods: __init__(headless), start(), fill_form(data: dict), submit(), close(), run(data, submit=False)
-6. CRITICAL: Use sample_data from the JSON if available. Use REAL option values from the "options" arrays. DO NOT make up values like "Zone 1" or "Ward 5" - use actual values from the discovered options!
-7. Proper error handling and logging
-8. For text/textarea fields, check visibility before filling
-9. For dropdowns, look in .ant-select-dropdown:visible for options (not all page options)
+5. Methods: __init__(headless=True, browser=None), start(), fill_form(data: dict), submit(), close(), run(data, submit=False). If a Playwright `browser` is passed in, start() reuses it and only opens a new context, and close() only closes that context
+6. fill_form() records the names of fields it could not fill in `self.fields_failed` (a list, empty when every field succeeded)
+7. CRITICAL: Use sample_data from the JSON if available. Use REAL option values from the "options" arrays. DO NOT make up values like "Zone 1" or "Ward 5" - use actual values from the discovered options!
+8. Proper error handling and logging
+9. For text/textarea fields, check visibility before filling
+10. For dropdowns, look in .ant-select-dropdown:visible for options (not all page options)
 
 Generate ONLY the Python code."""
 
@@ -4,25 +4,43 @@ Manages human-in-the-loop interactions and knowledge base updates
 """
 
 import asyncio
-import json
 import logging
-from typing import Dict, Any, Optional, Callable
+import os
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Callable, TYPE_CHECKING
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 
+import orjson
+
 from agents.base_agent import cost_tracker
-from agents.form_discovery_agent import FormDiscoveryAgent
-from agents.hybrid_discovery_strategy import HybridDiscoveryStrategy, DiscoveryConfig
-from agents.test_agent import TestValidationAgent
-from agents.js_analyzer_agent import JavaScriptAnalyzerAgent
-from agents.code_generator_agent import CodeGeneratorAgent
+
+# Agents (and the browser/LLM libraries they pull in) are imported on first
+# use, so reading session status doesn't pay for them
+if TYPE_CHECKING:
+    from agents.hybrid_discovery_strategy import DiscoveryConfig
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Separator line for phase banners in the log
+_BAR = "=" * 80
+
+# Session being trained by the current task (trainings run concurrently, so
+# this can't live on the orchestrator)
+_current_session: ContextVar[Optional["TrainingSession"]] = ContextVar(
+    "current_training_session", default=None
+)
+
+# Selector -> field name: drop "#", turn "$" (ASP.NET ids) into "_"
+_FIELD_NAME_TRANS = str.maketrans({"#": "", "$": "_"})
 
-@dataclass
+
+@dataclass(slots=True)
 class TrainingSession:
     """Represents a complete training session"""
 
@@ -39,26 +57,86 @@ class TrainingSession:
     test_result: Optional[Dict[str, Any]] = None
     code_gen_result: Optional[Dict[str, Any]] = None
 
+    # Parts of the results later phases consume, extracted once
+    schema: Optional[Dict[str, Any]] = None
+    js_analysis: Optional[Dict[str, Any]] = None
+    test_results: Optional[Dict[str, Any]] = None
+
     # Metrics
-    total_cost: float = 0.0
+    total_cost: float = 0.0  # Sum of agent_costs, set at finalize
+    agent_costs: Dict[str, float] = field(default_factory=dict)  # Per phase
     human_interventions: int = 0
     agent_attempts: Dict[str, int] = field(default_factory=dict)
 
     # Human feedback
     human_corrections: list = field(default_factory=list)
 
-    def to_dict(self):
-        return {
-            "session_id": self.session_id,
-            "municipality": self.municipality,
-            "url": self.url,
-            "start_time": str(self.start_time),
-            "end_time": str(self.end_time) if self.end_time else None,
-            "status": self.status,
-            "total_cost": self.total_cost,
-            "human_interventions": self.human_interventions,
-            "agent_attempts": self.agent_attempts,
+    # Monotonic clock readings, used for durations (immune to wall-clock jumps)
+    start_monotonic: float = field(default_factory=time.monotonic)
+    end_monotonic: Optional[float] = None
+
+    # ISO form of start_time, formatted once (see __post_init__)
+    start_iso: str = field(default="", init=False, repr=False, compare=False)
+
+    # Serialized view, rebuilt only after one of its fields is reassigned
+    _dict_cache: Optional[Dict[str, Any]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    # Fields exposed by to_dict (phase results etc. don't invalidate the cache)
+    _SERIALIZED_FIELDS = frozenset(
+        {
+            "session_id",
+            "municipality",
+            "url",
+            "start_time",
+            "end_time",
+            "status",
+            "total_cost",
+            "agent_costs",
+            "human_interventions",
+            "agent_attempts",
+            "human_corrections",
         }
+    )
+
+    def __post_init__(self):
+        self.start_iso = self.start_time.isoformat()
+
+    def __setattr__(self, name: str, value: Any):
+        object.__setattr__(self, name, value)
+        if name in self._SERIALIZED_FIELDS:
+            object.__setattr__(self, "_dict_cache", None)
+
+    def to_dict(self):
+        """Serializable view of the session (shared between calls, do not mutate)"""
+        if self._dict_cache is None:
+            self._dict_cache = {
+                "session_id": self.session_id,
+                "municipality": self.municipality,
+                "url": self.url,
+                "start_time": self.start_iso,
+                "end_time": self.end_time.isoformat() if self.end_time else None,
+                "status": self.status,
+                "total_cost": self.total_cost,
+                "agent_costs": self.agent_costs,
+                "human_interventions": self.human_interventions,
+                "agent_attempts": self.agent_attempts,
+                "human_corrections": self.human_corrections,
+            }
+        return self._dict_cache
+
+    def finish(self, status: str):
+        """Mark the session as ended with the given final status"""
+        self.status = status
+        self.end_monotonic = time.monotonic()
+        self.end_time = datetime.now()
+
+    @property
+    def duration(self) -> float:
+        """Elapsed seconds (so far, if the session is still running)"""
+        end = self.end_monotonic if self.end_monotonic is not None else time.monotonic()
+        return end - self.start_monotonic
 
 
 class Orchestrator:
@@ -66,15 +144,29 @@ class Orchestrator:
     Main coordinator for the AI agent training system
     """
 
+    # Training phases in execution order
+    PHASES = ("form_discovery", "js_analysis", "test_validation", "code_generation")
+
+    # Human-guided retries of failed phases allowed per session
+    MAX_PHASE_RETRIES = 3
+
+    # Seconds a completed session stays in memory after being saved to disk
+    ARCHIVE_AFTER = 3600
+
+    # Max agent actions delivered in one on_agent_action call
+    ACTION_BATCH_SIZE = 50
+
     def __init__(
         self,
         headless: bool = False,
         enable_human_recording: bool = False,
         on_human_needed: Optional[Callable] = None,
         enable_hybrid_discovery: bool = True,
-        hybrid_config: Optional[DiscoveryConfig] = None,
+        hybrid_config: Optional["DiscoveryConfig"] = None,
         browser_type: str = "firefox",
         skip_visual_analysis: bool = False,
+        eager_persist: bool = False,
+        max_concurrency: Optional[int] = None,
     ):
         self.headless = headless
         self.browser_type = browser_type  # "chromium", "firefox", or "webkit"
@@ -82,15 +174,18 @@ class Orchestrator:
             skip_visual_analysis  # Skip AI vision for faster/cheaper operation
         )
         self.enable_human_recording = enable_human_recording
+        # fsync each session file on save (otherwise call flush_sessions() after a batch)
+        self.eager_persist = eager_persist
+        self._unsynced_files: set = set()  # Saved session files awaiting flush_sessions()
         self.enable_hybrid_discovery = enable_hybrid_discovery
-        self.hybrid_config = hybrid_config or DiscoveryConfig(
-            use_browser_use_first=False,  # Try Playwright first (fast & cheap)
-            browser_use_on_failure=True,  # Use AI if confidence < 0.7
-            max_playwright_attempts=2,  # 2 attempts before AI
-        )
+        self.hybrid_config = hybrid_config  # Default built on first discovery
         self.sessions: Dict[str, TrainingSession] = {}
-        self.active_session: Optional[TrainingSession] = None
 
+        # Caps trainings running at once on this orchestrator (each drives
+        # browsers and LLM calls; too many just thrash)
+        self._training_slots = asyncio.Semaphore(
+            max_concurrency or os.cpu_count() or 1
+        )
         # Dashboard/UI support (optional)
         self.dashboard_enabled = False
 
@@ -100,12 +195,25 @@ class Orchestrator:
         self.on_human_needed: Optional[Callable] = on_human_needed
         self.on_cost_update: Optional[Callable] = None
 
-        # Results directory
+        # UI events are queued and delivered in order by one dispatcher task
+        # (created on first event, strong reference kept here)
+        self._ui_queue: Optional[asyncio.Queue] = None
+        self._ui_task: Optional[asyncio.Task] = None
+
+        # Idle agents by (class, constructor kwargs), see _pooled_agent()
+        self._agent_pool: Dict[tuple, list] = {}
+
+        # (cost_tracker.version, breakdown) of the last get_cost_breakdown()
+        self._cost_cache: tuple = (None, None)
+
+        # Results directory (created on first save)
         self.results_dir = Path("data/training_sessions")
-        self.results_dir.mkdir(parents=True, exist_ok=True)
+        self._results_dir_ready = False
 
         logger.info(
-            f"🚀 Orchestrator initialized (hybrid_discovery={'enabled' if enable_hybrid_discovery else 'disabled'}, browser={browser_type})"
+            "🚀 Orchestrator initialized (hybrid_discovery=%s, browser=%s)",
+            "enabled" if enable_hybrid_discovery else "disabled",
+            browser_type,
         )
 
     async def train_municipality(
@@ -123,119 +231,179 @@ class Orchestrator:
             Complete training result
         """
         # Create training session
-        session_id = f"{municipality}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        start_time = datetime.now()
+        session_id = f"{municipality}_{start_time:%Y%m%d_%H%M%S}"
         session = TrainingSession(
             session_id=session_id,
             municipality=municipality,
             url=url,
-            start_time=datetime.now(),
+            start_time=start_time,
         )
 
         self.sessions[session_id] = session
-        self.active_session = session
-
-        logger.info(f"🎯 Starting training session: {session_id}")
-        logger.info(f"   Municipality: {municipality}")
-        logger.info(f"   URL: {url}")
-
-        try:
-            # Phase 1: Form Discovery
-            logger.info("\n" + "=" * 80)
-            logger.info("PHASE 1: FORM DISCOVERY")
-            logger.info("=" * 80)
-
-            if self.dashboard_enabled:
-                self.emit_update(
-                    session_id, "Form Discovery", 0, "Starting form discovery..."
-                )
-
-            discovery_result = await self._run_form_discovery(
-                session, url, municipality, hints
-            )
-
-            if not discovery_result["success"]:
-                return await self._handle_failure(
-                    session, "form_discovery", discovery_result
-                )
-
-            session.discovery_result = discovery_result
-
-            if self.dashboard_enabled:
-                self.emit_update(
-                    session_id,
-                    "Form Discovery",
-                    25,
-                    f"Discovered {len(discovery_result.get('schema', {}).get('fields', []))} fields",
-                )
-
-            # Phase 2: JavaScript Analysis
-            logger.info("\n" + "=" * 80)
-            logger.info("PHASE 2: JAVASCRIPT ANALYSIS")
-            logger.info("=" * 80)
-
-            if self.dashboard_enabled:
-                self.emit_update(
-                    session_id,
-                    "JavaScript Analysis",
-                    25,
-                    "Analyzing dynamic JavaScript behavior...",
-                )
-
-            js_result = await self._run_js_analysis(session, url)
-            session.js_analysis_result = js_result
-
-            if self.dashboard_enabled:
-                self.emit_update(
-                    session_id,
-                    "JavaScript Analysis",
-                    40,
-                    "JavaScript analysis complete",
-                )
 
-            # Phase 3: Test Validation
-            logger.info("\n" + "=" * 80)
-            logger.info("PHASE 3: TEST VALIDATION")
-            logger.info("=" * 80)
+        logger.info("🎯 Starting training session: %s", session_id)
+        logger.info("   Municipality: %s", municipality)
+        logger.info("   URL: %s", url)
 
-            if self.dashboard_enabled:
-                self.emit_update(
-                    session_id, "Test Validation", 40, "Running validation tests..."
+        async with self._training_slots:
+            token = _current_session.set(session)
+            try:
+                await self._append_event(
+                    session,
+                    "start",
+                    {
+                        "municipality": municipality,
+                        "url": url,
+                        "start_time": session.start_iso,
+                    },
                 )
 
-            test_result = await self._run_validation_tests(session)
-
-            if not test_result["success"] or test_result.get("needs_review"):
-                return await self._request_human_review(session, test_result)
+                return await self._run_phases(session, hints=hints)
+            finally:
+                _current_session.reset(token)
 
-            session.test_result = test_result
-
-            if self.dashboard_enabled:
-                confidence = test_result.get("confidence_score", 0) * 100
-                self.emit_update(
-                    session_id,
-                    "Test Validation",
-                    60,
-                    f"Validation complete ({confidence:.0f}% confidence)",
-                )
+    async def _run_phases(
+        self,
+        session: TrainingSession,
+        start_phase: str = "form_discovery",
+        hints: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the training phases for a session, starting at start_phase
 
-            # Phase 4: Code Generation
-            logger.info("\n" + "=" * 80)
-            logger.info("PHASE 4: CODE GENERATION")
-            logger.info("=" * 80)
+        A failed phase that a human chooses to retry is re-run in place with
+        the new hints; phases that already succeeded are not repeated.
+        """
+        session_id = session.session_id
+        url = session.url
+        phase_index = self.PHASES.index(start_phase)
 
-            if self.dashboard_enabled:
-                self.emit_update(
-                    session_id, "Code Generation", 60, "Generating scraper code..."
-                )
+        try:
+            while True:
+                if phase_index <= 0:
+                    # Phase 1: Form Discovery
+                    logger.info("\n%s\nPHASE 1: FORM DISCOVERY\n%s", _BAR, _BAR)
+
+                    if self.dashboard_enabled:
+                        self.emit_update(
+                            session_id, "Form Discovery", 0, "Starting form discovery..."
+                        )
+
+                    discovery_result = await self._run_form_discovery(
+                        session, url, session.municipality, hints
+                    )
+
+                    if not discovery_result["success"]:
+                        outcome = await self._handle_failure(
+                            session, "form_discovery", discovery_result
+                        )
+                        if not outcome.get("retry"):
+                            return outcome
+                        hints = outcome["hints"]
+                        continue
+
+                    session.discovery_result = discovery_result
+                    session.schema = discovery_result.get("schema")
+                    phase_index = 1
+                    await self._append_event(
+                        session, "form_discovery", discovery_result
+                    )
+
+                    if self.dashboard_enabled:
+                        self.emit_update(
+                            session_id,
+                            "Form Discovery",
+                            25,
+                            f"Discovered {len((session.schema or {}).get('fields', []))} fields",
+                        )
+
+                if phase_index <= 2:
+                    # Phases 2 & 3: JavaScript Analysis + Test Validation
+                    # Both only need the discovered schema, so they run concurrently
+                    logger.info(
+                        "\n%s\nPHASE 2+3: JAVASCRIPT ANALYSIS + TEST VALIDATION\n%s",
+                        _BAR,
+                        _BAR,
+                    )
+
+                    if self.dashboard_enabled:
+                        self.emit_update(
+                            session_id,
+                            "JavaScript Analysis",
+                            25,
+                            "Analyzing dynamic JavaScript behavior...",
+                        )
+                        self.emit_update(
+                            session_id,
+                            "Test Validation",
+                            25,
+                            "Running validation tests...",
+                        )
+
+                    js_task = asyncio.create_task(self._run_js_analysis(session, url))
+                    test_task = asyncio.create_task(self._run_validation_tests(session))
+                    try:
+                        js_result, test_result = await asyncio.gather(
+                            js_task, test_task
+                        )
+                    except BaseException:
+                        # Don't leave the other phase submitting to the live
+                        # portal after this session has failed
+                        for task in (js_task, test_task):
+                            task.cancel()
+                        await asyncio.gather(js_task, test_task, return_exceptions=True)
+                        raise
+                    session.js_analysis_result = js_result
+                    session.js_analysis = js_result.get("analysis", {})
+                    await self._append_event(session, "js_analysis", js_result)
+
+                    if self.dashboard_enabled:
+                        self.emit_update(
+                            session_id,
+                            "JavaScript Analysis",
+                            40,
+                            "JavaScript analysis complete",
+                        )
+
+                    if not test_result["success"] or test_result.get("needs_review"):
+                        return await self._request_human_review(session, test_result)
+
+                    session.test_result = test_result
+                    session.test_results = test_result.get("results", {})
+                    phase_index = 3
+                    await self._append_event(session, "test_validation", test_result)
+
+                    if self.dashboard_enabled:
+                        confidence = test_result.get("confidence_score", 0) * 100
+                        self.emit_update(
+                            session_id,
+                            "Test Validation",
+                            60,
+                            f"Validation complete ({confidence:.0f}% confidence)",
+                        )
+
+                # Phase 4: Code Generation
+                logger.info("\n%s\nPHASE 4: CODE GENERATION\n%s", _BAR, _BAR)
+
+                if self.dashboard_enabled:
+                    self.emit_update(
+                        session_id, "Code Generation", 60, "Generating scraper code..."
+                    )
 
-            code_result = await self._run_code_generation(session)
+                code_result = await self._run_code_generation(session)
 
-            if not code_result["success"]:
-                return await self._handle_failure(
-                    session, "code_generation", code_result
-                )
+                if not code_result["success"]:
+                    outcome = await self._handle_failure(
+                        session, "code_generation", code_result
+                    )
+                    if not outcome.get("retry"):
+                        return outcome
+                    hints = outcome["hints"]
+                    continue
 
-            session.code_gen_result = code_result
+                session.code_gen_result = code_result
+                break
 
             if self.dashboard_enabled:
                 validation_status = (
@@ -251,9 +419,7 @@ class Orchestrator:
                 )
 
             # Phase 5: Finalize
-            logger.info("\n" + "=" * 80)
-            logger.info("TRAINING COMPLETE!")
-            logger.info("=" * 80)
+            logger.info("\n%s\nTRAINING COMPLETE!\n%s", _BAR, _BAR)
 
             if self.dashboard_enabled:
                 self.emit_update(session_id, "Complete", 100, "Training complete!")
@@ -261,16 +427,26 @@ class Orchestrator:
             result = await self._finalize_session(session)
 
             if self.dashboard_enabled:
-                self.emit_complete(session_id, True, result)
+                await self.emit_complete(session_id, True, result)
 
             return result
 
         except Exception as e:
-            logger.error(f"❌ Training session failed: {e}")
-            session.status = "failed"
-            session.end_time = datetime.now()
+            logger.error("❌ Training session failed: %s", e)
+            session.finish("failed")
             return {"success": False, "session_id": session_id, "error": str(e)}
 
+        finally:
+            # Aborted/failed/rejected sessions keep their log (there is no .json);
+            # mark it terminal so restore_unfinished_sessions() leaves it alone
+            if session.end_time is not None and session.status != "completed":
+                try:
+                    await self._append_event(
+                        session, "finish", {"status": session.status}
+                    )
+                except OSError as e:
+                    logger.warning("⚠️  Could not record session end: %s", e)
+
     async def _run_form_discovery(
         self,
         session: TrainingSession,
@@ -286,6 +462,18 @@ class Orchestrator:
                 "🔬 Using Hybrid Discovery Strategy (Playwright + Browser Use AI)"
             )
 
+            from agents.hybrid_discovery_strategy import (
+                HybridDiscoveryStrategy,
+                DiscoveryConfig,
+            )
+
+            if self.hybrid_config is None:
+                self.hybrid_config = DiscoveryConfig(
+                    use_browser_use_first=False,  # Try Playwright first (fast & cheap)
+                    browser_use_on_failure=True,  # Use AI if confidence < 0.7
+                    max_playwright_attempts=2,  # 2 attempts before AI
+                )
+
             strategy = HybridDiscoveryStrategy(
                 config=self.hybrid_config, browser_type=self.browser_type
             )
@@ -304,21 +492,29 @@ class Orchestrator:
                 "browser_use_needed": hybrid_result.get("needs_browser_use", False),
             }
 
-            logger.info(f"✅ Hybrid discovery complete:")
-            logger.info(
-                f"   - Strategies used: {', '.join(hybrid_result.get('strategy_used', []))}"
-            )
-            logger.info(f"   - Confidence: {hybrid_result.get('confidence', 0.0):.2f}")
-            logger.info(
-                f"   - Browser Use needed: {hybrid_result.get('needs_browser_use', False)}"
-            )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("✅ Hybrid discovery complete:")
+                logger.info(
+                    "   - Strategies used: %s",
+                    ", ".join(hybrid_result.get("strategy_used", [])),
+                )
+                logger.info(
+                    "   - Confidence: %.2f", hybrid_result.get("confidence", 0.0)
+                )
+                logger.info(
+                    "   - Browser Use needed: %s",
+                    hybrid_result.get("needs_browser_use", False),
+                )
 
             # Note: HybridDiscoveryStrategy doesn't track costs the same way
             # We'll estimate based on strategy used
             if "browser_use" in hybrid_result.get("strategy_used", []):
-                session.total_cost += 0.52  # Playwright ($0.02) + Browser Use ($0.50)
+                estimated_cost = 0.52  # Playwright + Browser Use
             else:
-                session.total_cost += 0.02  # Playwright only
+                estimated_cost = 0.02  # Playwright only
+            session.agent_costs["discovery"] = (
+                session.agent_costs.get("discovery", 0.0) + estimated_cost
+            )
 
             session.agent_attempts["discovery"] = 1
 
@@ -332,23 +528,24 @@ class Orchestrator:
             # Traditional Playwright-only discovery
             logger.info("📋 Using Standard Playwright Discovery")
 
-            agent = FormDiscoveryAgent(
+            from agents.form_discovery_agent import FormDiscoveryAgent
+
+            task = {"url": url, "municipality": municipality, "hints": hints or {}}
+
+            with self._pooled_agent(
+                FormDiscoveryAgent,
                 headless=self.headless,
                 browser_type=self.browser_type,
                 skip_visual_analysis=self.skip_visual_analysis,
-            )
-
-            # Set up callbacks
-            agent.on_status_change = self._agent_status_callback
-            agent.on_action = self._agent_action_callback
-            agent.on_human_needed = self._human_needed_callback
-
-            task = {"url": url, "municipality": municipality, "hints": hints or {}}
+            ) as agent:
+                agent.on_human_needed = self._human_needed_callback
 
-            result = await agent.execute(task)
+                result = await agent.execute(task)
 
-            session.agent_attempts["discovery"] = len(agent.attempts)
-            session.total_cost += agent.get_total_cost()
+                session.agent_attempts["discovery"] = len(agent.attempts)
+                session.agent_costs["discovery"] = (
+                    session.agent_costs.get("discovery", 0.0) + agent.get_total_cost()
+                )
 
             return result
 
@@ -356,73 +553,107 @@ class Orchestrator:
         self, session: TrainingSession, url: str
     ) -> Dict[str, Any]:
         """Phase 2: Run JavaScript analysis agent"""
+        from agents.js_analyzer_agent import JavaScriptAnalyzerAgent
 
-        agent = JavaScriptAnalyzerAgent(
-            headless=self.headless, browser_type=self.browser_type
-        )
-
-        agent.on_status_change = self._agent_status_callback
-        agent.on_action = self._agent_action_callback
+        task = {"url": url, "schema": session.schema}
 
-        task = {"url": url, "schema": session.discovery_result.get("schema")}
-
-        result = await agent.execute(task)
+        with self._pooled_agent(
+            JavaScriptAnalyzerAgent,
+            headless=self.headless,
+            browser_type=self.browser_type,
+        ) as agent:
+            result = await agent.execute(task)
 
-        session.agent_attempts["js_analysis"] = len(agent.attempts)
-        session.total_cost += agent.get_total_cost()
+            session.agent_attempts["js_analysis"] = len(agent.attempts)
+            session.agent_costs["js_analysis"] = (
+                session.agent_costs.get("js_analysis", 0.0) + agent.get_total_cost()
+            )
 
         return result
 
     async def _run_validation_tests(self, session: TrainingSession) -> Dict[str, Any]:
         """Phase 3: Run test validation agent"""
+        from agents.test_agent import TestValidationAgent
 
-        agent = TestValidationAgent(
-            headless=self.headless, browser_type=self.browser_type
-        )
-
-        agent.on_status_change = self._agent_status_callback
-        agent.on_action = self._agent_action_callback
+        task = {"schema": session.schema}
 
-        task = {"schema": session.discovery_result.get("schema")}
-
-        result = await agent.execute(task)
+        with self._pooled_agent(
+            TestValidationAgent,
+            headless=self.headless,
+            browser_type=self.browser_type,
+        ) as agent:
+            result = await agent.execute(task)
 
-        session.agent_attempts["testing"] = len(agent.attempts)
-        session.total_cost += agent.get_total_cost()
+            session.agent_attempts["testing"] = len(agent.attempts)
+            session.agent_costs["testing"] = (
+                session.agent_costs.get("testing", 0.0) + agent.get_total_cost()
+            )
 
         return result
 
     async def _run_code_generation(self, session: TrainingSession) -> Dict[str, Any]:
         """Phase 4: Run code generator agent"""
-
-        agent = CodeGeneratorAgent()
-
-        agent.on_status_change = self._agent_status_callback
-        agent.on_action = self._agent_action_callback
+        from agents.code_generator_agent import CodeGeneratorAgent
 
         task = {
-            "schema": session.discovery_result.get("schema"),
-            "js_analysis": session.js_analysis_result.get("analysis", {}),
-            "test_results": session.test_result.get("results", {}),
+            "schema": session.schema,
+            "js_analysis": session.js_analysis,
+            "test_results": session.test_results,
         }
 
-        result = await agent.execute(task)
+        with self._pooled_agent(CodeGeneratorAgent) as agent:
+            result = await agent.execute(task)
 
-        session.agent_attempts["code_generation"] = len(agent.attempts)
-        session.total_cost += agent.get_total_cost()
+            session.agent_attempts["code_generation"] = len(agent.attempts)
+            session.agent_costs["code_generation"] = (
+                session.agent_costs.get("code_generation", 0.0) + agent.get_total_cost()
+            )
 
         return result
 
+    @contextmanager
+    def _pooled_agent(self, agent_cls: type, **kwargs):
+        """
+        Check out an idle agent of the given class/config, creating one if needed
+
+        Agents are reset and returned to the pool afterwards, so repeated
+        trainings reuse them instead of rebuilding their clients each phase.
+        """
+        key = (agent_cls, tuple(sorted(kwargs.items())))
+        idle = self._agent_pool.setdefault(key, [])
+        if idle:
+            agent = idle.pop()
+            agent.reset()
+        else:
+            agent = agent_cls(**kwargs)
+            agent.on_status_change = self._agent_status_callback
+            agent.on_action = self._agent_action_callback
+
+        try:
+            yield agent
+        finally:
+            idle.append(agent)
+
     async def _handle_failure(
         self, session: TrainingSession, phase: str, result: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Handle agent failure - may request human intervention"""
+        """
+        Handle agent failure - may request human intervention
+
+        Returns the final result, or {"retry": True, "hints": ...} when the
+        human asks for the failed phase to be retried.
+        """
+
+        logger.warning("⚠️  Phase %s failed or needs review", phase)
 
-        logger.warning(f"⚠️  Phase {phase} failed or needs review")
+        # Each human-guided retry leaves one entry in human_corrections
+        retries_left = len(session.human_corrections) < self.MAX_PHASE_RETRIES
+        if not retries_left:
+            logger.warning("⚠️  Retry limit (%d) reached", self.MAX_PHASE_RETRIES)
 
         session.status = "waiting_human"
 
-        if self.on_human_needed:
+        if self.on_human_needed and retries_left:
             human_response = await self.on_human_needed(
                 session_id=session.session_id, phase=phase, failure_info=result
             )
@@ -438,16 +669,12 @@ class Orchestrator:
                     }
                 )
 
-                # Retry the training with hints
-                return await self.train_municipality(
-                    url=session.url,
-                    municipality=session.municipality,
-                    hints=human_response.get("hints"),
-                )
+                # Retry the failed phase with hints (caller re-runs it)
+                session.status = "in_progress"
+                return {"retry": True, "hints": human_response.get("hints")}
             else:
                 # Human aborted
-                session.status = "aborted"
-                session.end_time = datetime.now()
+                session.finish("aborted")
                 return {
                     "success": False,
                     "session_id": session.session_id,
@@ -455,9 +682,8 @@ class Orchestrator:
                     "message": "Training aborted by human",
                 }
 
-        # No human callback, just fail
-        session.status = "failed"
-        session.end_time = datetime.now()
+        # No human callback (or retries exhausted), just fail
+        session.finish("failed")
         return {
             "success": False,
             "session_id": session.session_id,
@@ -473,14 +699,15 @@ class Orchestrator:
         logger.info("🙋 Requesting human review...")
 
         session.status = "waiting_human"
+        session.test_results = test_result.get("results", {})
 
         if self.on_human_needed:
             review_data = {
                 "session_id": session.session_id,
-                "schema": session.discovery_result.get("schema"),
+                "schema": session.schema,
                 "test_results": test_result,
-                "js_analysis": session.js_analysis_result.get("analysis"),
-                "total_cost_so_far": session.total_cost,
+                "js_analysis": session.js_analysis,
+                "total_cost_so_far": sum(session.agent_costs.values()),
             }
 
             human_response = await self.on_human_needed(
@@ -497,6 +724,7 @@ class Orchestrator:
                 # Update schema with human corrections if any
                 if human_response.get("corrections"):
                     session.discovery_result["schema"] = human_response["corrections"]
+                    session.schema = human_response["corrections"]
 
                 # Continue to code generation
                 code_result = await self._run_code_generation(session)
@@ -505,8 +733,7 @@ class Orchestrator:
                 return await self._finalize_session(session)
             else:
                 logger.info("❌ Human rejected, aborting")
-                session.status = "rejected"
-                session.end_time = datetime.now()
+                session.finish("rejected")
                 return {
                     "success": False,
                     "session_id": session.session_id,
@@ -523,8 +750,7 @@ class Orchestrator:
 
         if code_result is None:
             logger.error("❌ Code generation returned None")
-            session.status = "failed"
-            session.end_time = datetime.now()
+            session.finish("failed")
             return {
                 "success": False,
                 "session_id": session.session_id,
@@ -559,37 +785,54 @@ class Orchestrator:
     async def _finalize_session(self, session: TrainingSession) -> Dict[str, Any]:
         """Finalize training session and save results"""
 
-        session.status = "completed"
-        session.end_time = datetime.now()
+        session.finish("completed")
 
-        # Calculate final cost from global tracker
-        session.total_cost = cost_tracker.total_cost
+        # Total of every phase run, human-approved retries included
+        session.total_cost = sum(session.agent_costs.values())
+
+        # Save session to file (replaces the in-progress event log)
+        await self._ensure_results_dir()
 
-        # Save session to file
         session_file = self.results_dir / f"{session.session_id}.json"
-        with open(session_file, "w") as f:
-            json.dump(session.to_dict(), f, indent=2, default=str)
-
-        logger.info(f"\n{'='*80}")
-        logger.info(f"🎉 TRAINING SESSION COMPLETED!")
-        logger.info(f"{'='*80}")
-        logger.info(f"Session ID: {session.session_id}")
-        logger.info(f"Municipality: {session.municipality}")
-        logger.info(f"Total Cost: ${session.total_cost:.4f}")
-        logger.info(f"Human Interventions: {session.human_interventions}")
-        logger.info(
-            f"Duration: {(session.end_time - session.start_time).total_seconds():.1f}s"
+        # Human hints are free-form: stringify sets, paths and non-str keys
+        data = orjson.dumps(
+            session.to_dict(),
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+            default=str,
+        )
+        await asyncio.to_thread(self._write_session_file, session_file, data)
+        if not self.eager_persist:
+            self._unsynced_files.add(session_file)
+        await asyncio.to_thread(
+            self._event_log_path(session.session_id).unlink, missing_ok=True
         )
 
-        if session.code_gen_result:
+        # Saved to disk - drop from memory later, get_session_status() reads the file
+        asyncio.get_running_loop().call_later(
+            self.ARCHIVE_AFTER, self._archive_session, session
+        )
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("\n%s\n🎉 TRAINING SESSION COMPLETED!\n%s", _BAR, _BAR)
+            logger.info("Session ID: %s", session.session_id)
+            logger.info("Municipality: %s", session.municipality)
+            logger.info("Total Cost: $%.4f", session.total_cost)
+            logger.info("Human Interventions: %s", session.human_interventions)
             logger.info(
-                f"Scraper: {session.code_gen_result.get('scraper', {}).get('file_path')}"
+                "Duration: %.1fs",
+                session.duration,
             )
 
-        logger.info(f"Session saved: {session_file}")
-        logger.info(f"{'='*80}\n")
+            if session.code_gen_result:
+                logger.info(
+                    "Scraper: %s",
+                    session.code_gen_result.get("scraper", {}).get("file_path"),
+                )
 
-        return {
+            logger.info("Session saved: %s", session_file)
+            logger.info("%s\n", _BAR)
+
+        result = {
             "success": True,
             "session_id": session.session_id,
             "municipality": session.municipality,
@@ -599,25 +842,207 @@ class Orchestrator:
             "session_file": str(session_file),
         }
 
+        self._shrink_session(session)
+        return result
+
+    def _shrink_session(self, session: TrainingSession):
+        """
+        Replace bulky results of a persisted session with small stubs
+
+        Completed sessions stay in self.sessions for a while; the schema,
+        analysis and hints are no longer needed there once saved. The stubs
+        keep the summary keys callers read after training (field labels and
+        types, confidence, the scraper's path and validation outcome).
+        """
+
+        def stub(phase_result: Optional[Dict[str, Any]], **summary):
+            if phase_result is None:
+                return None
+            return {"success": phase_result.get("success"), **summary}
+
+        discovery = session.discovery_result or {}
+        fields = (discovery.get("schema") or {}).get("fields", [])
+        session.discovery_result = stub(
+            session.discovery_result,
+            schema={
+                "fields": [
+                    {"label": f.get("label"), "type": f.get("type")} for f in fields
+                ]
+            },
+        )
+        session.js_analysis_result = stub(session.js_analysis_result)
+        session.test_result = stub(
+            session.test_result,
+            confidence_score=(session.test_result or {}).get("confidence_score", 0),
+        )
+        scraper = (session.code_gen_result or {}).get("scraper", {})
+        session.code_gen_result = stub(
+            session.code_gen_result,
+            scraper={
+                key: scraper[key]
+                for key in (
+                    "file_path",
+                    "validation_passed",
+                    "validation_attempts",
+                    "confidence_score",
+                )
+                if key in scraper
+            },
+        )
+        session.schema = session.js_analysis = session.test_results = None
+        session.human_corrections = [
+            {"phase": c["phase"], "feedback": c.get("feedback")}
+            for c in session.human_corrections
+        ]
+
+    async def _ensure_results_dir(self):
+        """Create the results directory on first use"""
+        if not self._results_dir_ready:
+            await asyncio.to_thread(
+                self.results_dir.mkdir, parents=True, exist_ok=True
+            )
+            self._results_dir_ready = True
+
+    def _event_log_path(self, session_id: str) -> Path:
+        return self.results_dir / f"{session_id}.jsonl"
+
+    async def _append_event(
+        self, session: TrainingSession, event: str, data: Dict[str, Any]
+    ):
+        """
+        Append a phase event to the session's JSONL log
+
+        Completed phase results survive a crash, so restore_unfinished_sessions()
+        + resume_training() can continue without re-running them.
+        """
+        await self._ensure_results_dir()
+        line = orjson.dumps({"event": event, "data": data}, default=str) + b"\n"
+        await asyncio.to_thread(
+            self._append_bytes, self._event_log_path(session.session_id), line
+        )
+
+    @staticmethod
+    def _append_bytes(path: Path, data: bytes):
+        with open(path, "ab") as f:
+            f.write(data)
+
+    def restore_unfinished_sessions(self) -> List[str]:
+        """
+        Rebuild sessions whose event log was never finalized (e.g. after a crash)
+
+        Restored sessions get status "interrupted"; returns their ids. Logs that
+        end in a "finish" event (aborted, failed or rejected sessions) are skipped.
+        """
+        restored = []
+        for log_file in self.results_dir.glob("*.jsonl"):
+            if log_file.with_suffix(".json").exists():
+                continue
+
+            session = None
+            for line in log_file.read_bytes().splitlines():
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    break  # Truncated last line from the crash
+                event, data = record["event"], record["data"]
+
+                if event == "start":
+                    session = TrainingSession(
+                        session_id=log_file.stem,
+                        municipality=data["municipality"],
+                        url=data["url"],
+                        start_time=datetime.fromisoformat(data["start_time"]),
+                    )
+                elif session is None:
+                    break
+                elif event == "finish":
+                    session = None  # Ended on purpose, nothing to resume
+                    break
+                elif event == "form_discovery":
+                    session.discovery_result = data
+                    session.schema = data.get("schema")
+                elif event == "js_analysis":
+                    session.js_analysis_result = data
+                    session.js_analysis = data.get("analysis", {})
+                elif event == "test_validation":
+                    session.test_result = data
+                    session.test_results = data.get("results", {})
+
+            if session is not None:
+                session.status = "interrupted"
+                self.sessions[session.session_id] = session
+                restored.append(session.session_id)
+
+        return restored
+
+    async def resume_training(self, session_id: str) -> Dict[str, Any]:
+        """Continue a restored session from its first incomplete phase"""
+        session = self.sessions[session_id]
+
+        if session.discovery_result is None:
+            start_phase = "form_discovery"
+        elif session.js_analysis_result is None or session.test_result is None:
+            start_phase = "js_analysis"  # Runs JS analysis + validation together
+        else:
+            start_phase = "code_generation"
+
+        async with self._training_slots:
+            session.status = "in_progress"
+            token = _current_session.set(session)
+            try:
+                return await self._run_phases(session, start_phase=start_phase)
+            finally:
+                _current_session.reset(token)
+
+    def _write_session_file(self, session_file: Path, data: bytes):
+        """Write serialized session in one buffered write (fsync only if eager_persist)"""
+        with open(session_file, "wb", buffering=1 << 20) as f:
+            f.write(data)
+            if self.eager_persist:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def flush_sessions(self):
+        """Flush the session files saved since the last call to disk (call once after a batch)"""
+        paths, self._unsynced_files = self._unsynced_files, set()
+        for path in paths:
+            try:
+                with open(path, "ab") as f:
+                    os.fsync(f.fileno())
+            except OSError as e:
+                logger.warning("⚠️  Could not flush %s: %s", path, e)
+
     # Callback methods for agent status updates
 
     async def _agent_status_callback(self, agent_name: str, status):
         """Called when an agent changes status"""
         if self.on_status_update:
-            await self.on_status_update(agent_name, status.value)
+            self._dispatch_ui(
+                ("status", agent_name), self.on_status_update, agent_name, status.value
+            )
 
     async def _agent_action_callback(self, agent_name: str, action):
-        """Called when an agent takes an action"""
-        if self.on_agent_action:
-            await self.on_agent_action(
-                agent_name,
-                {
-                    "type": action.action_type,
-                    "description": action.description,
-                    "result": str(action.result)[:200],
-                    "cost": action.cost,
-                },
-            )
+        """
+        Called when an agent takes an action
+
+        on_agent_action(agent_name, actions) always receives a list of action
+        dicts; actions that pile up while the UI is busy share one call (see
+        _ui_dispatcher).
+        """
+        if self.on_agent_action is None:
+            return
+
+        self._dispatch_ui(
+            ("action", agent_name),
+            self.on_agent_action,
+            agent_name,
+            {
+                "type": action.action_type,
+                "description": action.description,
+                "result": str(action.result)[:200],
+                "cost": action.cost,
+            },
+        )
 
     async def _human_needed_callback(
         self,
@@ -627,41 +1052,68 @@ class Orchestrator:
         attempts: list,
     ) -> Dict[str, Any]:
         """Called when an agent needs human help"""
-        logger.warning(f"\n🙋 [{agent_name}] Requesting human intervention")
-        logger.warning(f"   Attempts: {len(attempts)}")
-        logger.warning(f"   Reflection: {reflection.get('reflection', 'N/A')[:200]}")
-
-        if self.on_human_needed:
-            return await self.on_human_needed(
-                session_id=(
-                    self.active_session.session_id if self.active_session else "unknown"
-                ),
-                phase=f"agent_{agent_name}",
-                failure_info={
-                    "agent": agent_name,
-                    "task": task,
-                    "reflection": reflection,
-                    "attempts": len(attempts),
-                },
+        if self.on_human_needed is None:
+            # Default: no human available, fail
+            return {"continue": False}
+
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning("\n🙋 [%s] Requesting human intervention", agent_name)
+            logger.warning("   Attempts: %d", len(attempts))
+            logger.warning(
+                "   Reflection: %s", reflection.get("reflection", "N/A")[:200]
             )
 
-        # Default: no human available, fail
-        return {"continue": False}
+        session = _current_session.get()
+        return await self.on_human_needed(
+            session_id=session.session_id if session else "unknown",
+            phase=f"agent_{agent_name}",
+            failure_info={
+                "agent": agent_name,
+                "task": task,
+                "reflection": reflection,
+                "attempts": len(attempts),
+            },
+        )
+
+    def _archive_session(self, session: TrainingSession):
+        """Evict a persisted session from memory (unless it was replaced or is active)"""
+        if (
+            self.sessions.get(session.session_id) is session
+            and session.status != "in_progress"
+        ):
+            del self.sessions[session.session_id]
 
     def get_session_status(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get current status of a training session"""
+        """Get current status of a training session (archived ones are read from disk)"""
         session = self.sessions.get(session_id)
         if session:
             return session.to_dict()
-        return None
+
+        session_file = self.results_dir / f"{session_id}.json"
+        try:
+            return orjson.loads(session_file.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return None
 
     def get_cost_breakdown(self) -> Dict[str, Any]:
-        """Get detailed cost breakdown"""
-        return {
+        """Get detailed cost breakdown (snapshot reused until new calls are tracked)"""
+        version, breakdown = self._cost_cache
+        if version == cost_tracker.version:
+            return breakdown
+
+        breakdown = {
             "total_cost": cost_tracker.total_cost,
-            "by_model": cost_tracker.calls_by_model,
-            "by_agent": cost_tracker.calls_by_agent,
+            "by_model": {
+                model: dict(stats)
+                for model, stats in cost_tracker.calls_by_model.items()
+            },
+            "by_agent": {
+                agent: dict(stats)
+                for agent, stats in cost_tracker.calls_by_agent.items()
+            },
         }
+        self._cost_cache = (cost_tracker.version, breakdown)
+        return breakdown
 
     async def _offer_human_recording(
         self, session: TrainingSession
@@ -725,20 +1177,21 @@ class Orchestrator:
                 return None
 
             logger.info(
-                f"✅ Recording complete: {recording_result['actions_count']} actions"
-            )
-
-            # Store recording as ground truth in pattern library
-            await self._store_recording_as_ground_truth(
-                session=session, recording_result=recording_result
+                "✅ Recording complete: %d actions", recording_result["actions_count"]
             )
 
-            # Generate scraper from recording
             from train_from_recording import generate_scraper_from_recording
 
-            scraper_result = await generate_scraper_from_recording(
-                recording_file=recording_result["recording_file"],
-                municipality=session.municipality,
+            # Store recording as ground truth in pattern library and generate
+            # the scraper from it concurrently (both only read the recording)
+            _, scraper_result = await asyncio.gather(
+                self._store_recording_as_ground_truth(
+                    session=session, recording_result=recording_result
+                ),
+                generate_scraper_from_recording(
+                    recording_file=recording_result["recording_file"],
+                    municipality=session.municipality,
+                ),
             )
 
             return {
@@ -759,7 +1212,7 @@ class Orchestrator:
             logger.info("\n🛑 Recording interrupted by user")
             return None
         except Exception as e:
-            logger.error(f"❌ Recording failed: {e}")
+            logger.error("❌ Recording failed: %s", e)
             return None
 
     async def _store_recording_as_ground_truth(
@@ -775,31 +1228,40 @@ class Orchestrator:
         - Proven to work (actual submission)
         """
         from knowledge.pattern_library import PatternLibrary
-        import json
 
         pattern_lib = PatternLibrary()
 
         # Load recording file
         recording_file = recording_result.get("recording_file")
-        with open(recording_file, "r") as f:
-            recording_data = json.load(f)
+        recording_data = orjson.loads(
+            await asyncio.to_thread(Path(recording_file).read_bytes)
+        )
 
-        # Extract field mappings from recorded actions
+        # Extract field mappings and detect Select2 in one pass over the actions
         fields = []
+        has_select2 = False
+        extract_name = self._extract_field_name
+        append_field = fields.append
         for action in recording_data.get("actions", []):
-            if action["action_type"] in ["fill", "select"]:
-                fields.append(
-                    {
-                        "name": self._extract_field_name(action["selector"]),
-                        "type": (
-                            "select" if action["action_type"] == "select" else "text"
-                        ),
-                        "selector": action["selector"],
-                        "value": action.get("value"),
-                        "required": True,  # Assume recorded fields are required
-                        "element_info": action.get("element_info", {}),
-                    }
-                )
+            action_type = action["action_type"]
+            if action_type not in ("fill", "select"):
+                continue
+
+            element_info = action.get("element_info", {})
+            if action_type == "select" and not has_select2:
+                has_select2 = "select2" in element_info.get("class", "").lower()
+
+            selector = action["selector"]
+            append_field(
+                {
+                    "name": extract_name(selector),
+                    "type": "select" if action_type == "select" else "text",
+                    "selector": selector,
+                    "value": action.get("value"),
+                    "required": True,  # Assume recorded fields are required
+                    "element_info": element_info,
+                }
+            )
 
         # Create ground truth schema
         ground_truth_schema = {
@@ -811,17 +1273,11 @@ class Orchestrator:
             "confidence": 1.0,
         }
 
-        # Detect Select2 from recorded actions
-        has_select2 = any(
-            "select2" in action.get("element_info", {}).get("class", "").lower()
-            for action in recording_data.get("actions", [])
-            if action["action_type"] == "select"
-        )
-
         # Store in pattern library with highest confidence
         logger.info("💾 Storing human recording as ground truth in pattern library...")
 
-        pattern_lib.store_pattern(
+        await asyncio.to_thread(
+            pattern_lib.store_pattern,
             municipality_name=session.municipality,
             form_url=session.url,
             form_schema=ground_truth_schema,
@@ -836,38 +1292,125 @@ class Orchestrator:
         )
 
         logger.info("✅ Ground truth stored in pattern library")
-        logger.info(f"   Fields recorded: {len(fields)}")
-        logger.info(f"   Select2 detected: {has_select2}")
+        logger.info("   Fields recorded: %d", len(fields))
+        logger.info("   Select2 detected: %s", has_select2)
         logger.info("   Future training runs will learn from this recording!")
 
     def _extract_field_name(self, selector: str) -> str:
         """Extract field name from selector"""
-        # Remove # and common prefixes
-        name = selector.replace("#", "").replace("$", "_")
-        # Extract last part if contains path
-        if "." in name:
-            name = name.split(".")[-1]
-        return name
+        # Strip prefixes in one pass, then keep the last part if it contains a path
+        return selector.translate(_FIELD_NAME_TRANS).rpartition(".")[2]
 
     def emit_update(self, session_id: str, phase: str, progress: int, message: str):
         """Emit progress update (for dashboard/UI integration)"""
         if self.on_status_update:
-            asyncio.create_task(
-                self.on_status_update(
-                    session_id,
-                    {"phase": phase, "progress": progress, "message": message},
-                )
+            self._dispatch_ui(
+                (session_id, phase),
+                self.on_status_update,
+                session_id,
+                {"phase": phase, "progress": progress, "message": message},
             )
 
-    def emit_complete(self, session_id: str, success: bool, result: Dict[str, Any]):
-        """Emit completion event (for dashboard/UI integration)"""
+    async def emit_complete(
+        self, session_id: str, success: bool, result: Dict[str, Any]
+    ):
+        """
+        Emit completion event (for dashboard/UI integration)
+
+        Returns once it and all earlier updates have been delivered.
+        """
         if self.on_status_update:
-            asyncio.create_task(
-                self.on_status_update(
-                    session_id,
-                    {"phase": "complete", "success": success, "result": result},
-                )
+            self._dispatch_ui(
+                None,
+                self.on_status_update,
+                session_id,
+                {"phase": "complete", "success": success, "result": result},
             )
+            await self._ui_queue.join()
+
+    def _dispatch_ui(self, key: Optional[tuple], callback: Callable, *args):
+        """
+        Queue a UI callback for the background dispatcher
+
+        Events sharing a non-None key are coalesced: if several are pending
+        when the dispatcher catches up, only the latest one is delivered.
+        """
+        task = self._ui_task
+        if (
+            task is None
+            or task.done()
+            or task.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._ui_queue = asyncio.Queue(maxsize=256)
+            self._ui_task = asyncio.create_task(self._ui_dispatcher(self._ui_queue))
+
+        event = (key, callback, args)
+        try:
+            self._ui_queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # UI is far behind - drop the oldest pending event
+            self._ui_queue.get_nowait()
+            self._ui_queue.task_done()
+            self._ui_queue.put_nowait(event)
+
+    async def _ui_dispatcher(self, queue: asyncio.Queue):
+        """
+        Deliver queued UI events in order
+
+        Whatever accumulated while the previous callback ran is handled as one
+        backlog: keyed status/progress events collapse to the latest per key,
+        and consecutive actions of one agent go out as a single batch.
+        """
+        while True:
+            backlog = [await queue.get()]
+            while not queue.empty():
+                backlog.append(queue.get_nowait())
+
+            latest = {
+                key: i
+                for i, (key, _, _) in enumerate(backlog)
+                if key and key[0] != "action"
+            }
+            i = 0
+            while i < len(backlog):
+                key, callback, args = backlog[i]
+                end = i + 1
+                if key and key[0] == "action":
+                    while (
+                        end < len(backlog)
+                        and backlog[end][0] == key
+                        and end - i < self.ACTION_BATCH_SIZE
+                    ):
+                        end += 1
+                    batch = [event_args[1] for _, _, event_args in backlog[i:end]]
+                    args = (args[0], batch)
+                elif key and latest[key] != i:
+                    callback = None  # Superseded by a later event
+
+                if callback is not None:
+                    try:
+                        await callback(*args)
+                    except Exception as e:
+                        logger.warning("⚠️  UI update callback failed: %s", e)
+
+                for _ in range(i, end):
+                    queue.task_done()
+                i = end
+
+    async def aclose(self):
+        """Deliver pending UI events, stop the dispatcher and close shared browsers"""
+        # Only a loaded test agent can hold shared browsers; don't import it here
+        test_agent = sys.modules.get("agents.test_agent")
+        if test_agent is not None:
+            await test_agent.TestValidationAgent.shutdown()
+
+        if self._ui_task is None:
+            return
+        if not self._ui_task.done():
+            await self._ui_queue.join()
+            self._ui_task.cancel()
+        await asyncio.gather(self._ui_task, return_exceptions=True)
+        self._ui_task = None
 
 
 # For testing
@@ -876,20 +1419,27 @@ async def test_orchestrator():
 
     orchestrator = Orchestrator(headless=False)
 
-    result = await orchestrator.train_municipality(
-        url="https://smartranchi.in/Portal/View/ComplaintRegistration.aspx?m=Online",
-        municipality="ranchi_smart_test",
-    )
+    try:
+        result = await orchestrator.train_municipality(
+            url="https://smartranchi.in/Portal/View/ComplaintRegistration.aspx?m=Online",
+            municipality="ranchi_smart_test",
+        )
+    finally:
+        await orchestrator.aclose()
 
     print("\n" + "=" * 80)
     print("FINAL RESULT")
     print("=" * 80)
-    print(json.dumps(result, indent=2, default=str))
+    print(orjson.dumps(result, option=orjson.OPT_INDENT_2, default=str).decode())
 
     print("\n" + "=" * 80)
     print("COST BREAKDOWN")
     print("=" * 80)
-    print(json.dumps(orchestrator.get_cost_breakdown(), indent=2))
+    print(
+        orjson.dumps(
+            orchestrator.get_cost_breakdown(), option=orjson.OPT_INDENT_2
+        ).decode()
+    )
 
 
 if __name__ == "__main__":
@@ -5,16 +5,22 @@ Scraper Validator - Self-healing validation loop for generated scrapers
 Runs the generated scraper, captures errors, and uses AI to fix issues
 until the scraper works correctly.
 """
+import ast
 import asyncio
+import hashlib
+import inspect
 import json
 import os
 import re
 import traceback
+import types
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 import anthropic
+from PIL import Image
 from playwright.async_api import (
     async_playwright,
     Page,
@@ -22,11 +28,50 @@ from playwright.async_api import (
     Error as PlaywrightError,
 )
 import base64
+import io
+import logging
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Resource types aborted in validation runs. Stylesheets are kept: the
+# screenshots go to AI vision, which needs the styled form to judge it.
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+
+# Screenshots sent to AI vision are downscaled to fit this box and re-encoded
+# as JPEG; the full-resolution PNG stays on disk for debugging
+VISION_MAX_SIZE = (1280, 1280)
+VISION_JPEG_QUALITY = 80
+
+# Patterns for parsing AI responses
+_JSON_RE = re.compile(r"\{[\s\S]*\}")
+_CODE_RE = re.compile(r"```python\s*(.*?)\s*```", re.DOTALL)
+_CHANGES_RE = re.compile(
+    r"CHANGES?:?\s*(.*?)(?=CODE:|```|$)", re.DOTALL | re.IGNORECASE
+)
+_ANALYSIS_RE = re.compile(
+    r"ANALYSIS:?\s*(.*?)(?=CHANGES?:|$)", re.DOTALL | re.IGNORECASE
+)
+
+
+def _prepare_vision_image(png_bytes: bytes) -> str:
+    """Downscale a PNG screenshot and return it base64 encoded as JPEG"""
+    with Image.open(io.BytesIO(png_bytes)) as img:
+        img.thumbnail(VISION_MAX_SIZE)
+        buffer = io.BytesIO()
+        img.convert("RGB").save(
+            buffer, "JPEG", quality=VISION_JPEG_QUALITY, optimize=True
+        )
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _vision_media_type(screenshot_base64: str) -> str:
+    """Media type of a base64 screenshot (JPEG when prepared for vision)"""
+    return "image/jpeg" if screenshot_base64.startswith("/9j/") else "image/png"
+
 
 @dataclass
 class ValidationResult:
@@ -44,6 +89,18 @@ class ValidationResult:
     fields_failed: List[str] = field(default_factory=list)
     validation_errors: List[str] = field(default_factory=list)
     duration_seconds: float = 0.0
+    # Captured traceback of the error, formatted into stack_trace on demand
+    error_traceback: Optional[traceback.TracebackException] = field(
+        default=None, repr=False
+    )
+    # Full-resolution PNG, kept only until the vision copy is made
+    screenshot_png: Optional[bytes] = field(default=None, repr=False)
+
+    def get_stack_trace(self) -> Optional[str]:
+        """Formatted stack trace of the error (built on first call)"""
+        if self.stack_trace is None and self.error_traceback is not None:
+            self.stack_trace = "".join(self.error_traceback.format())
+        return self.stack_trace
 
 
 @dataclass
@@ -60,20 +117,20 @@ class FixResult:
 class CostTracker:
     """Track API costs"""
 
+    # USD per token as (input, output)
     PRICING = {
-        "claude-sonnet-4-5-20250929": {"input": 3.0, "output": 15.0},
-        "claude-opus-4-5-20250929": {"input": 15.0, "output": 75.0},
+        "claude-sonnet-4-5-20250929": (3.0e-6, 15.0e-6),
+        "claude-opus-4-5-20250929": (15.0e-6, 75.0e-6),
     }
+    DEFAULT_PRICING = (3.0e-6, 15.0e-6)
 
     def __init__(self):
         self.total_cost = 0.0
         self.calls = 0
 
     def add(self, model: str, input_tokens: int, output_tokens: int) -> float:
-        pricing = self.PRICING.get(model, {"input": 3.0, "output": 15.0})
-        cost = (input_tokens * pricing["input"] / 1_000_000) + (
-            output_tokens * pricing["output"] / 1_000_000
-        )
+        input_price, output_price = self.PRICING.get(model, self.DEFAULT_PRICING)
+        cost = input_tokens * input_price + output_tokens * output_price
         self.total_cost += cost
         self.calls += 1
         return cost
@@ -82,9 +139,50 @@ class CostTracker:
 class ScreenshotVerifier:
     """Verify form state using screenshots and AI vision"""
 
-    def __init__(self, client: anthropic.Anthropic, cost_tracker: CostTracker):
+    def __init__(self, client: anthropic.AsyncAnthropic, cost_tracker: CostTracker):
         self.client = client
         self.cost_tracker = cost_tracker
+        # (screenshot_base64, image block) of the last screenshot sent
+        self._last_image: Tuple[Optional[str], Optional[Dict[str, Any]]] = (None, None)
+
+    def _image_block(self, screenshot_base64: str) -> Dict[str, Any]:
+        """Message content block for a screenshot (reused across questions on it)"""
+        cached_base64, block = self._last_image
+        if cached_base64 is not screenshot_base64:
+            block = {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": _vision_media_type(screenshot_base64),
+                    "data": screenshot_base64,
+                },
+            }
+            self._last_image = (screenshot_base64, block)
+        return block
+
+    async def _ask(self, screenshot_base64: str, prompt: str) -> str:
+        """Send one vision request about the screenshot and return the reply text"""
+        response = await self.client.messages.create(
+            model="claude-sonnet-4-5-20250929",
+            max_tokens=1000,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        self._image_block(screenshot_base64),
+                        {"type": "text", "text": prompt},
+                    ],
+                }
+            ],
+        )
+
+        self.cost_tracker.add(
+            "claude-sonnet-4-5-20250929",
+            response.usage.input_tokens,
+            response.usage.output_tokens,
+        )
+
+        return response.content[0].text
 
     async def verify_screenshot(
         self, screenshot_base64: str, verification_query: str, context: str = ""
@@ -93,7 +191,7 @@ class ScreenshotVerifier:
         Use AI vision to verify something about the screenshot
 
         Args:
-            screenshot_base64: Base64 encoded screenshot
+            screenshot_base64: Base64 encoded screenshot (PNG or JPEG)
             verification_query: What to verify (e.g., "Is the dropdown open?")
             context: Additional context about what we're doing
 
@@ -115,38 +213,12 @@ Respond with JSON:
     "suggestions": ["list of suggestions if issues found"]
 }}"""
 
-        response = self.client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=1000,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "image/png",
-                                "data": screenshot_base64,
-                            },
-                        },
-                        {"type": "text", "text": prompt},
-                    ],
-                }
-            ],
-        )
-
-        self.cost_tracker.add(
-            "claude-sonnet-4-5-20250929",
-            response.usage.input_tokens,
-            response.usage.output_tokens,
-        )
+        text = await self._ask(screenshot_base64, prompt)
 
         # Parse response
-        text = response.content[0].text
         try:
             # Extract JSON from response
-            json_match = re.search(r"\{[\s\S]*\}", text)
+            json_match = _JSON_RE.search(text)
             if json_match:
                 return json.loads(json_match.group())
         except:
@@ -166,45 +238,120 @@ Respond with JSON:
         """
         Verify the form is in the expected state
 
+        All questions are answered in a single vision call.
+
         Args:
             screenshot_base64: Screenshot of current form state
             expected_state: What we expect to see
                 - fields_filled: List of field names that should be filled
                 - dropdown_selected: Dict of dropdown -> expected value
                 - no_errors: Whether there should be no validation errors
+
+        Returns:
+            Dict with "results" (one entry per question, in order, with
+            "check", "query", "answer", "observation" and "issues"), plus
+            "issues_detected" aggregated over all questions. "check" is
+            "fields_filled", "dropdown_selected" or "no_errors".
         """
         queries = []
 
         if expected_state.get("fields_filled"):
             fields = ", ".join(expected_state["fields_filled"])
-            queries.append(f"Are these fields visibly filled with values: {fields}?")
+            queries.append(
+                (
+                    "fields_filled",
+                    f"Are these fields visibly filled with values: {fields}?",
+                )
+            )
 
         if expected_state.get("dropdown_selected"):
             for dropdown, value in expected_state["dropdown_selected"].items():
                 queries.append(
-                    f"Does the {dropdown} dropdown show '{value}' as selected?"
+                    (
+                        "dropdown_selected",
+                        f"Does the {dropdown} dropdown show '{value}' as selected?",
+                    )
                 )
 
         if expected_state.get("no_errors", True):
             queries.append(
-                "Are there any visible error messages or validation warnings on the form?"
+                (
+                    "no_errors",
+                    "Are there any visible error messages or validation warnings on the form?",
+                )
             )
 
-        combined_query = "\n".join(f"{i+1}. {q}" for i, q in enumerate(queries))
-
-        return await self.verify_screenshot(
-            screenshot_base64,
-            combined_query,
-            "Verifying form state after filling fields",
+        numbered_queries = "\n".join(
+            f"{i+1}. {q}" for i, (_, q) in enumerate(queries)
         )
 
+        prompt = f"""Analyze this screenshot of a web form and answer each numbered question:
+
+{numbered_queries}
+
+CONTEXT: Verifying form state after filling fields
+
+Respond with JSON:
+{{
+    "results": [
+        {{
+            "idx": <question number>,
+            "answer": "yes" | "no" | "unclear",
+            "observation": "what you see for this question",
+            "issues": ["problems relevant to this question"]
+        }}
+    ],
+    "global_issues": ["any other problems visible"]
+}}"""
+
+        text = await self._ask(screenshot_base64, prompt)
+
+        parsed = {}
+        try:
+            json_match = _JSON_RE.search(text)
+            if json_match:
+                parsed = json.loads(json_match.group())
+        except:
+            pass
+
+        answers = {
+            r.get("idx"): r for r in parsed.get("results", []) if isinstance(r, dict)
+        }
+        results = []
+        issues = list(parsed.get("global_issues", []))
+        for i, (check, query) in enumerate(queries, start=1):
+            answer = answers.get(i, {})
+            results.append(
+                {
+                    "check": check,
+                    "query": query,
+                    "answer": answer.get("answer", "unclear"),
+                    "observation": answer.get("observation", "" if parsed else text),
+                    "issues": answer.get("issues", []),
+                }
+            )
+            issues.extend(answer.get("issues", []))
+
+        return {"results": results, "issues_detected": issues}
+
 
 class CodeCorrectionAgent:
     """AI agent that fixes scraper code based on runtime errors"""
 
-    def __init__(self, client: anthropic.Anthropic, cost_tracker: CostTracker):
+    # Fix requests remembered for identical inputs
+    FIX_CACHE_SIZE = 128
+
+    # Prompt size limits
+    STACK_TRACE_LINES = 40  # innermost frames are the most specific
+    MAX_PREVIOUS_FIXES = 8
+    MAX_DROPDOWN_CHARS = 1500
+    MAX_HTML_CHARS = 3000
+
+    def __init__(self, client: anthropic.AsyncAnthropic, cost_tracker: CostTracker):
         self.client = client
         self.cost_tracker = cost_tracker
+        # Input digest -> task producing the fix (shared by identical requests)
+        self._fix_cache: "OrderedDict[bytes, asyncio.Task]" = OrderedDict()
 
     async def fix_code(
         self,
@@ -220,6 +367,9 @@ class CodeCorrectionAgent:
         """
         Analyze error and generate fixed code
 
+        Identical requests (same code, error and context) are sent to the API
+        only once; repeats and concurrent duplicates share the first result.
+
         Args:
             current_code: Current scraper code
             error: Error message
@@ -233,6 +383,96 @@ class CodeCorrectionAgent:
         Returns:
             FixResult with new code and explanation
         """
+        key = self._fix_key(
+            current_code,
+            error,
+            error_type,
+            stack_trace,
+            screenshot_base64,
+            page_html,
+            previous_fixes,
+            dropdown_context,
+        )
+
+        task = self._fix_cache.get(key)
+        if task is not None:
+            self._fix_cache.move_to_end(key)
+            # Shielded: one caller giving up must not cancel it for the others
+            result = await asyncio.shield(task)
+            # The API cost was already counted by the first request
+            return replace(result, cost=0.0)
+
+        task = asyncio.ensure_future(
+            self._request_fix(
+                current_code,
+                error,
+                error_type,
+                stack_trace,
+                screenshot_base64,
+                page_html,
+                previous_fixes,
+                dropdown_context,
+            )
+        )
+        self._fix_cache[key] = task
+        task.add_done_callback(lambda t: self._forget_failed_fix(key, t))
+        while len(self._fix_cache) > self.FIX_CACHE_SIZE:
+            self._fix_cache.popitem(last=False)
+
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _fix_key(
+        current_code: str,
+        error: str,
+        error_type: str,
+        stack_trace: str,
+        screenshot_base64: Optional[str],
+        page_html: Optional[str],
+        previous_fixes: Optional[List[str]],
+        dropdown_context: Optional[Dict],
+    ) -> bytes:
+        """Digest of everything that goes into a fix prompt"""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (
+            error_type,
+            error,
+            stack_trace,
+            current_code,
+            screenshot_base64 or "",
+            page_html or "",
+            *(previous_fixes or ()),
+        ):
+            digest.update(part.encode("utf-8", "surrogatepass"))
+            digest.update(b"\0")
+        if dropdown_context:
+            digest.update(json.dumps(dropdown_context, sort_keys=True).encode())
+        return digest.digest()
+
+    def _forget_failed_fix(self, key: bytes, task: asyncio.Task):
+        """Drop failed requests and unusable fixes from the cache so they can be retried"""
+        if (
+            task.cancelled()
+            or task.exception() is not None
+            or not task.result().success
+        ):
+            if self._fix_cache.get(key) is task:
+                del self._fix_cache[key]
+
+    async def _request_fix(
+        self,
+        current_code: str,
+        error: str,
+        error_type: str,
+        stack_trace: str,
+        screenshot_base64: Optional[str],
+        page_html: Optional[str],
+        previous_fixes: Optional[List[str]],
+        dropdown_context: Optional[Dict],
+    ) -> FixResult:
+        """Ask the AI for a fix and parse its response"""
+        stack_trace = "\n".join(stack_trace.splitlines()[-self.STACK_TRACE_LINES :])
+
         # Build the prompt
         prompt_parts = [
             "You are a code correction agent for Playwright web scrapers.",
@@ -253,22 +493,26 @@ class CodeCorrectionAgent:
                 [
                     "",
                     "## PREVIOUS FIX ATTEMPTS (DO NOT REPEAT THESE)",
-                    *[f"- {fix}" for fix in previous_fixes],
+                    *[
+                        f"- {fix}"
+                        for fix in previous_fixes[-self.MAX_PREVIOUS_FIXES :]
+                    ],
                 ]
             )
 
         if dropdown_context:
+            dropdown_json = json.dumps(dropdown_context, indent=2)
             prompt_parts.extend(
                 [
                     "",
                     "## KNOWN DROPDOWN OPTIONS",
-                    f"```json\n{json.dumps(dropdown_context, indent=2)[:2000]}\n```",
+                    f"```json\n{dropdown_json[: self.MAX_DROPDOWN_CHARS]}\n```",
                 ]
             )
 
         if page_html:
             # Truncate HTML to relevant portion
-            html_snippet = page_html[:3000] if len(page_html) > 3000 else page_html
+            html_snippet = page_html[: self.MAX_HTML_CHARS]
             prompt_parts.extend(
                 ["", "## PAGE HTML (truncated)", f"```html\n{html_snippet}\n```"]
             )
@@ -307,7 +551,7 @@ class CodeCorrectionAgent:
                     "type": "image",
                     "source": {
                         "type": "base64",
-                        "media_type": "image/png",
+                        "media_type": _vision_media_type(screenshot_base64),
                         "data": screenshot_base64,
                     },
                 }
@@ -315,7 +559,7 @@ class CodeCorrectionAgent:
 
         messages_content.append({"type": "text", "text": prompt})
 
-        response = self.client.messages.create(
+        response = await self.client.messages.create(
             model="claude-sonnet-4-5-20250929",
             max_tokens=8000,
             messages=[{"role": "user", "content": messages_content}],
@@ -330,14 +574,12 @@ class CodeCorrectionAgent:
         text = response.content[0].text
 
         # Extract code from response
-        code_match = re.search(r"```python\s*(.*?)\s*```", text, re.DOTALL)
+        code_match = _CODE_RE.search(text)
         new_code = code_match.group(1) if code_match else ""
 
         # Extract changes list
         changes = []
-        changes_match = re.search(
-            r"CHANGES?:?\s*(.*?)(?=CODE:|```|$)", text, re.DOTALL | re.IGNORECASE
-        )
+        changes_match = _CHANGES_RE.search(text)
         if changes_match:
             changes_text = changes_match.group(1)
             changes = [
@@ -347,22 +589,19 @@ class CodeCorrectionAgent:
             ]
 
         # Extract reasoning
-        analysis_match = re.search(
-            r"ANALYSIS:?\s*(.*?)(?=CHANGES?:|$)", text, re.DOTALL | re.IGNORECASE
-        )
+        analysis_match = _ANALYSIS_RE.search(text)
         reasoning = analysis_match.group(1).strip() if analysis_match else ""
 
-        # Validate syntax before returning
+        # Validate syntax before returning (parse only, no bytecode)
         if new_code:
             try:
-                compile(new_code, "<string>", "exec")
+                ast.parse(new_code)
             except SyntaxError as e:
-                logger = __import__("logging").getLogger(__name__)
-                logger.warning(f"Generated code has syntax error: {e}")
+                logger.warning("Generated code has syntax error: %s", e)
                 # Try to fix common issues
                 new_code = self._fix_common_syntax_errors(new_code)
                 try:
-                    compile(new_code, "<string>", "exec")
+                    ast.parse(new_code)
                 except SyntaxError:
                     # Still broken, return failure
                     return FixResult(
@@ -383,24 +622,20 @@ class CodeCorrectionAgent:
 
     def _fix_common_syntax_errors(self, code: str) -> str:
         """Try to fix common syntax errors in generated code"""
-        import re
-
         # Fix unclosed strings
         lines = code.split("\n")
         fixed_lines = []
 
         for line in lines:
-            # Count quotes
-            single_quotes = line.count("'") - line.count("\\'")
-            double_quotes = line.count('"') - line.count('\\"')
+            single_odd, double_odd = _quote_parity(line)
 
             # If odd number of quotes, might be unclosed string
-            if single_quotes % 2 != 0:
+            if single_odd:
                 # Try to close it
                 if "'" in line and not line.rstrip().endswith("'"):
                     line = line.rstrip() + "'"
 
-            if double_quotes % 2 != 0:
+            if double_odd:
                 if '"' in line and not line.rstrip().endswith('"'):
                     line = line.rstrip() + '"'
 
@@ -409,6 +644,22 @@ class CodeCorrectionAgent:
         return "\n".join(fixed_lines)
 
 
+def _quote_parity(line: str) -> Tuple[int, int]:
+    """Parity (0 or 1) of unescaped single and double quotes in a line, in one pass"""
+    single = double = 0
+    escaped = False
+    for ch in line:
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif ch == "'":
+            single ^= 1
+        elif ch == '"':
+            double ^= 1
+    return single, double
+
+
 class ScraperValidator:
     """
     Self-healing validation loop for generated scrapers
@@ -417,19 +668,28 @@ class ScraperValidator:
     until successful or max attempts reached.
     """
 
+    # Compiled scraper versions kept per validator
+    CODE_CACHE_SIZE = 32
+
     def __init__(
         self,
         max_attempts: int = 3,
         screenshot_dir: str = "screenshots/validation",
         headless: bool = True,
+        block_resources: bool = True,
+        speculative_fixes: bool = False,
     ):
         self.max_attempts = max_attempts
         self.screenshot_dir = Path(screenshot_dir)
         self.screenshot_dir.mkdir(parents=True, exist_ok=True)
         self.headless = headless
+        self.block_resources = block_resources
+        # Race a second fix request without the screenshot (at most two
+        # requests per attempt) and apply whichever usable fix arrives first
+        self.speculative_fixes = speculative_fixes
 
         self.api_key = os.getenv("api_key")
-        self.client = anthropic.Anthropic(
+        self.client = anthropic.AsyncAnthropic(
             api_key=self.api_key, base_url="https://ai.megallm.io"
         )
         self.cost_tracker = CostTracker()
@@ -440,6 +700,18 @@ class ScraperValidator:
         self.validation_history: List[ValidationResult] = []
         self.fix_history: List[FixResult] = []
 
+        # Content hash of the last loaded scraper and the FormFiller class
+        # found in it, so retries on unchanged code skip re-executing it
+        self._last_code_hash: Optional[bytes] = None
+        self._last_filler_class: Optional[type] = None
+        # Compiled scrapers by content hash, for code seen again later
+        self._code_cache: "OrderedDict[bytes, types.CodeType]" = OrderedDict()
+
+        # Browser shared by all attempts of a validation run, for fillers
+        # that accept one (see _shared_browser)
+        self._playwright = None
+        self._browser: Optional[Browser] = None
+
     async def validate_scraper(
         self,
         scraper_path: str,
@@ -464,84 +736,142 @@ class ScraperValidator:
         if not scraper_path.exists():
             raise FileNotFoundError(f"Scraper not found: {scraper_path}")
 
-        print(f"\n{'='*60}")
-        print("SCRAPER VALIDATION - Self-Healing Loop")
-        print(f"{'='*60}")
-        print(f"Scraper: {scraper_path}")
-        print(f"Max attempts: {self.max_attempts}")
-        print(f"Dry run: {dry_run}")
-        print(f"{'='*60}\n")
-
-        previous_fixes = []
+        logger.info(
+            "SCRAPER VALIDATION - Self-Healing Loop\n"
+            "Scraper: %s\nMax attempts: %d\nDry run: %s",
+            scraper_path,
+            self.max_attempts,
+            dry_run,
+        )
 
-        for attempt in range(1, self.max_attempts + 1):
-            print(f"\n[Attempt {attempt}/{self.max_attempts}]")
+        # Unique changes tried so far, most recent last (normalized -> text)
+        previous_fixes: Dict[str, str] = {}
+        # Code on disk, i.e. what the next attempt runs
+        current_code = scraper_path.read_text()
 
-            # Run the scraper
-            result = await self._run_scraper_test(
-                scraper_path, test_data, attempt, dry_run=dry_run
-            )
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                logger.info("[Attempt %d/%d]", attempt, self.max_attempts)
 
-            self.validation_history.append(result)
+                # Run the scraper
+                result = await self._run_scraper_test(
+                    scraper_path, test_data, attempt, dry_run=dry_run
+                )
 
-            if result.success:
-                print(f"✅ Validation PASSED on attempt {attempt}")
-                print(f"   Fields filled: {len(result.fields_filled)}")
-                print(f"   Total cost: ${self.cost_tracker.total_cost:.4f}")
+                self.validation_history.append(result)
 
-                # Store successful pattern in library for future reuse
-                await self._store_successful_pattern(
-                    scraper_path=scraper_path,
-                    portal_context=portal_context,
-                    validation_attempts=attempt,
-                )
+                if result.success:
+                    result.screenshot_png = None
+                    logger.info(
+                        "✅ Validation PASSED on attempt %d (%d fields filled, "
+                        "total cost $%.4f)",
+                        attempt,
+                        len(result.fields_filled),
+                        self.cost_tracker.total_cost,
+                    )
 
-                return True, str(scraper_path), self.validation_history
+                    # Store successful pattern in library for future reuse
+                    await self._store_successful_pattern(
+                        scraper_path=scraper_path,
+                        scraper_code=current_code,
+                        portal_context=portal_context,
+                        validation_attempts=attempt,
+                    )
 
-            print(f"❌ Attempt {attempt} failed: {result.error_type}")
-            print(
-                f"   Error: {result.error[:100]}..."
-                if result.error
-                else "   Unknown error"
-            )
+                    return True, str(scraper_path), self.validation_history
 
-            if attempt < self.max_attempts:
-                # Try to fix the code
-                print(f"\n🔧 Attempting AI code fix...")
-
-                current_code = scraper_path.read_text()
-
-                fix_result = await self.code_corrector.fix_code(
-                    current_code=current_code,
-                    error=result.error or "Unknown error",
-                    error_type=result.error_type or "Unknown",
-                    stack_trace=result.stack_trace or "",
-                    screenshot_base64=result.screenshot_base64,
-                    previous_fixes=previous_fixes,
-                    dropdown_context=(
-                        portal_context.get("dropdowns") if portal_context else None
-                    ),
+                logger.warning(
+                    "❌ Attempt %d failed: %s: %s",
+                    attempt,
+                    result.error_type,
+                    result.error[:100] if result.error else "Unknown error",
                 )
 
-                self.fix_history.append(fix_result)
-
-                if fix_result.success and fix_result.new_code:
-                    print(f"   Fix applied: {len(fix_result.changes_made)} changes")
-                    for change in fix_result.changes_made[:3]:
-                        print(f"   - {change[:60]}...")
+                if attempt < self.max_attempts:
+                    # Try to fix the code
+                    logger.info("🔧 Attempting AI code fix...")
+
+                    fix_result = await self._request_fix(
+                        current_code=current_code,
+                        error=result.error or "Unknown error",
+                        error_type=result.error_type or "Unknown",
+                        stack_trace=result.get_stack_trace() or "",
+                        screenshot_base64=await self._vision_screenshot(result),
+                        previous_fixes=list(previous_fixes.values()),
+                        dropdown_context=(
+                            portal_context.get("dropdowns") if portal_context else None
+                        ),
+                    )
 
-                    # Save fixed code
-                    scraper_path.write_text(fix_result.new_code)
-                    previous_fixes.extend(fix_result.changes_made)
+                    self.fix_history.append(fix_result)
+
+                    if fix_result.success and fix_result.new_code:
+                        if logger.isEnabledFor(logging.INFO):
+                            logger.info(
+                                "   Fix applied: %d changes (cost $%.4f)%s",
+                                len(fix_result.changes_made),
+                                fix_result.cost,
+                                "".join(
+                                    f"\n   - {change[:60]}..."
+                                    for change in fix_result.changes_made[:3]
+                                ),
+                            )
 
-                    print(f"   Cost: ${fix_result.cost:.4f}")
+                        # Save fixed code
+                        scraper_path.write_text(fix_result.new_code)
+                        current_code = fix_result.new_code
+                        for change in fix_result.changes_made:
+                            key = change.strip().lower()
+                            previous_fixes.pop(key, None)
+                            previous_fixes[key] = change.strip()
+                    else:
+                        logger.warning("   ⚠️ AI could not generate fix")
+                        break
                 else:
-                    print(f"   ⚠️ AI could not generate fix")
+                    # No fix follows the last attempt, so its PNG is not needed
+                    result.screenshot_png = None
+
+            logger.warning(
+                "❌ Validation FAILED after %d attempts (total cost $%.4f)",
+                self.max_attempts,
+                self.cost_tracker.total_cost,
+            )
+            return False, str(scraper_path), self.validation_history
+        finally:
+            await self._close_shared_browser()
+
+    async def _request_fix(self, **fix_kwargs) -> FixResult:
+        """Ask the code corrector for a fix, speculatively racing two prompts"""
+        if not (self.speculative_fixes and fix_kwargs.get("screenshot_base64")):
+            return await self.code_corrector.fix_code(**fix_kwargs)
+
+        # The variant without the image is smaller and usually returns sooner
+        candidates = [
+            asyncio.ensure_future(self.code_corrector.fix_code(**fix_kwargs)),
+            asyncio.ensure_future(
+                self.code_corrector.fix_code(
+                    **{**fix_kwargs, "screenshot_base64": None}
+                )
+            ),
+        ]
+        fix_result = None
+        error = None
+        try:
+            for next_fix in asyncio.as_completed(candidates):
+                try:
+                    fix_result = await next_fix
+                except Exception as e:
+                    error = e
+                    continue
+                if fix_result.success and fix_result.new_code:
                     break
+        finally:
+            for candidate in candidates:
+                candidate.cancel()
 
-        print(f"\n❌ Validation FAILED after {self.max_attempts} attempts")
-        print(f"   Total cost: ${self.cost_tracker.total_cost:.4f}")
-        return False, str(scraper_path), self.validation_history
+        if fix_result is None:
+            raise error
+        return fix_result
 
     async def _run_scraper_test(
         self,
@@ -559,57 +889,79 @@ class ScraperValidator:
         playwright = None
 
         try:
-            # Import the scraper dynamically
-            import importlib.util
-
-            spec = importlib.util.spec_from_file_location("scraper", scraper_path)
-            scraper_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(scraper_module)
-
-            # Find the form filler class
-            filler_class = None
-            for name, obj in vars(scraper_module).items():
-                if name.endswith("FormFiller") and isinstance(obj, type):
-                    filler_class = obj
-                    break
+            filler_class = self._load_filler_class(scraper_path)
 
             if not filler_class:
                 result.error = "No FormFiller class found in scraper"
                 result.error_type = "ImportError"
                 return result
 
-            # Create instance and run
-            filler = filler_class(headless=self.headless)
+            # Create instance and run; fillers that accept a browser get the
+            # shared one and only open a new context, instead of relaunching
+            if "browser" in inspect.signature(filler_class).parameters:
+                filler = filler_class(
+                    headless=self.headless, browser=await self._shared_browser()
+                )
+            else:
+                filler = filler_class(headless=self.headless)
 
             try:
                 await filler.start()
                 result.page_url = filler.page.url if filler.page else None
 
+                if self.block_resources:
+                    await self._block_heavy_resources(filler)
+
+                # Uncaught page exceptions while filling. Console errors are
+                # not used: blocked resources log them on every run.
+                page_errors = []
+                if filler.page:
+                    filler.page.on(
+                        "pageerror", lambda exc: page_errors.append(str(exc))
+                    )
+
                 # Fill the form
                 await filler.fill_form(test_data)
 
-                # Take screenshot after filling
+                # Take screenshot after filling; prepare the AI analysis copy
+                # from the same buffer that gets saved, without reading it back
                 screenshot_path = self.screenshot_dir / f"attempt_{attempt}_filled.png"
-                await filler.page.screenshot(path=str(screenshot_path))
+                result.screenshot_png = await filler.page.screenshot()
+                screenshot_path.write_bytes(result.screenshot_png)
                 result.screenshot_path = str(screenshot_path)
 
-                # Read screenshot as base64 for AI analysis
-                with open(screenshot_path, "rb") as f:
-                    result.screenshot_base64 = base64.b64encode(f.read()).decode()
-
-                # Verify the form state using AI vision
-                verification = await self.screenshot_verifier.verify_screenshot(
-                    result.screenshot_base64,
-                    "Are all form fields filled correctly? Are there any visible error messages or validation warnings?",
-                    f"Form was filled with test data. Checking for issues.",
-                )
-
-                if verification.get("issues_detected"):
-                    result.validation_errors = verification["issues_detected"]
-                    result.error = f"Visual verification found issues: {verification['issues_detected']}"
+                # Fillers that track failed fields and ran without page errors
+                # give a clear structural result; only ask AI vision otherwise
+                fields_failed = getattr(filler, "fields_failed", None)
+                issues, errors_shown, unfilled = [], [], []
+                if fields_failed is None or fields_failed or page_errors:
+                    result.fields_failed = list(fields_failed or [])
+                    # Verify the form state using AI vision (one call,
+                    # per-question answers)
+                    verification = await self.screenshot_verifier.verify_form_state(
+                        await self._vision_screenshot(result),
+                        {"fields_filled": list(test_data.keys()), "no_errors": True},
+                    )
+                    issues = verification["issues_detected"]
+                    for r in verification["results"]:
+                        if r["check"] == "no_errors":
+                            if r["answer"] == "yes":
+                                errors_shown.append(r)
+                        elif r["answer"] == "no":
+                            unfilled.append(r)
+
+                if issues or errors_shown:
+                    result.validation_errors = issues or [
+                        r["observation"] for r in errors_shown
+                    ]
+                    result.error = (
+                        f"Visual verification found issues: {result.validation_errors}"
+                    )
                     result.error_type = "ValidationError"
-                elif verification.get("answer") == "no":
-                    result.error = f"Form not filled correctly: {verification.get('observation', '')}"
+                elif unfilled:
+                    result.error = (
+                        f"Form not filled correctly: {unfilled[0]['observation']}"
+                    )
                     result.error_type = "FillError"
                 else:
                     # If not dry_run, we would submit here
@@ -634,7 +986,9 @@ class ScraperValidator:
         except PlaywrightError as e:
             result.error = str(e)
             result.error_type = type(e).__name__
-            result.stack_trace = traceback.format_exc()
+            result.error_traceback = traceback.TracebackException.from_exception(
+                e, lookup_lines=False
+            )
 
             # Try to take error screenshot
             try:
@@ -642,23 +996,113 @@ class ScraperValidator:
                     error_screenshot = (
                         self.screenshot_dir / f"attempt_{attempt}_error.png"
                     )
-                    await filler.page.screenshot(path=str(error_screenshot))
+                    result.screenshot_png = await filler.page.screenshot()
+                    error_screenshot.write_bytes(result.screenshot_png)
                     result.screenshot_path = str(error_screenshot)
-                    with open(error_screenshot, "rb") as f:
-                        result.screenshot_base64 = base64.b64encode(f.read()).decode()
             except:
                 pass
 
         except Exception as e:
             result.error = str(e)
             result.error_type = type(e).__name__
-            result.stack_trace = traceback.format_exc()
+            result.error_traceback = traceback.TracebackException.from_exception(
+                e, lookup_lines=False
+            )
 
         finally:
             result.duration_seconds = (datetime.now() - start_time).total_seconds()
 
         return result
 
+    @staticmethod
+    async def _vision_screenshot(result: ValidationResult) -> Optional[str]:
+        """Base64 vision copy of the attempt's screenshot, made once on demand
+
+        The PNG is dropped afterwards so the validation history only keeps
+        the smaller copy.
+        """
+        if result.screenshot_base64 is None and result.screenshot_png is not None:
+            result.screenshot_base64 = await asyncio.to_thread(
+                _prepare_vision_image, result.screenshot_png
+            )
+            result.screenshot_png = None
+        return result.screenshot_base64
+
+    def _load_filler_class(self, scraper_path: Path) -> Optional[type]:
+        """Import the scraper and return its FormFiller class
+
+        The module is only re-executed when the file contents changed since
+        the previous load.
+        """
+        source = scraper_path.read_bytes()
+        digest = hashlib.blake2b(source, digest_size=16).digest()
+        if digest == self._last_code_hash:
+            return self._last_filler_class
+
+        # Import the scraper dynamically, compiling it only if not seen before
+        code = self._code_cache.get(digest)
+        if code is None:
+            code = compile(source, str(scraper_path), "exec")
+            self._code_cache[digest] = code
+            if len(self._code_cache) > self.CODE_CACHE_SIZE:
+                self._code_cache.popitem(last=False)
+        else:
+            self._code_cache.move_to_end(digest)
+
+        scraper_module = types.ModuleType("scraper")
+        scraper_module.__file__ = str(scraper_path)
+        exec(code, scraper_module.__dict__)
+
+        # Find the form filler class: an explicit FormFiller alias or the
+        # exported names first, a scan of the whole module only as fallback
+        filler_class = getattr(scraper_module, "FormFiller", None)
+        if not isinstance(filler_class, type):
+            names = getattr(scraper_module, "__all__", None) or vars(scraper_module)
+            filler_class = next(
+                (
+                    obj
+                    for name in names
+                    if name.endswith("FormFiller")
+                    and isinstance(obj := getattr(scraper_module, name, None), type)
+                ),
+                None,
+            )
+
+        self._last_code_hash = digest
+        self._last_filler_class = filler_class
+        return filler_class
+
+    async def _shared_browser(self) -> Browser:
+        """Browser reused across validation attempts, launched on first use"""
+        if self._browser is None:
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(
+                headless=self.headless
+            )
+        return self._browser
+
+    async def _close_shared_browser(self):
+        """Close the shared browser at the end of a validation run"""
+        if self._browser is not None:
+            await self._browser.close()
+            await self._playwright.stop()
+            self._browser = None
+            self._playwright = None
+
+    async def _block_heavy_resources(self, filler):
+        """Abort image/media/font requests for the filler's browser session"""
+
+        async def handle(route):
+            if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+                await route.abort()
+            else:
+                await route.continue_()
+
+        # Route on the context when exposed so it also covers popups and frames
+        target = getattr(filler, "context", None) or getattr(filler, "page", None)
+        if target is not None:
+            await target.route("**/*", handle)
+
     async def dry_run(
         self,
         scraper_path: str,
@@ -676,9 +1120,7 @@ class ScraperValidator:
         Returns:
             Detailed report of the dry run
         """
-        print(f"\n{'='*60}")
-        print("DRY RUN - Form Fill Verification")
-        print(f"{'='*60}\n")
+        logger.info("DRY RUN - Form Fill Verification")
 
         success, final_path, history = await self.validate_scraper(
             scraper_path=scraper_path, test_data=test_data, dry_run=True
@@ -718,6 +1160,7 @@ class ScraperValidator:
     async def _store_successful_pattern(
         self,
         scraper_path: Path,
+        scraper_code: str,
         portal_context: Optional[Dict],
         validation_attempts: int,
     ):
@@ -758,12 +1201,9 @@ class ScraperValidator:
                     }
 
             if not form_schema.get("fields"):
-                print("   ⚠️ No form schema available, skipping pattern storage")
+                logger.warning("⚠️ No form schema, skipping pattern storage")
                 return
 
-            # Read the successful code
-            scraper_code = scraper_path.read_text()
-
             # Calculate confidence based on validation attempts
             # Fewer attempts = higher confidence (worked faster)
             confidence = max(0.5, 1.0 - (validation_attempts - 1) * 0.15)
@@ -783,14 +1223,17 @@ class ScraperValidator:
             )
 
             if success:
-                print(f"   📚 Pattern stored in library (confidence: {confidence:.0%})")
+                logger.info(
+                    "📚 Pattern stored in library (confidence: %.0f%%)",
+                    confidence * 100,
+                )
             else:
-                print(f"   ⚠️ Failed to store pattern")
+                logger.warning("⚠️ Failed to store pattern")
 
         except ImportError:
-            print("   ⚠️ Pattern library not available")
+            logger.warning("⚠️ Pattern library not available")
         except Exception as e:
-            print(f"   ⚠️ Pattern storage error: {e}")
+            logger.warning("⚠️ Pattern storage error: %s", e)
 
     def get_summary(self) -> str:
         """Get human-readable summary of validation"""
@@ -819,6 +1262,8 @@ async def main():
     """Test the validator"""
     import sys
 
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     if len(sys.argv) < 2:
         print("Usage: python scraper_validator.py <scraper_path> [--submit]")
         print("\nExample:")
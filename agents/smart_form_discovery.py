@@ -7,27 +7,213 @@ This is 100x more efficient than using browser-use for discovery.
 """
 import asyncio
 import os
-import json
+import re
+import aiofiles
+import httpx
+import orjson
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
 from dotenv import load_dotenv
-from playwright.async_api import async_playwright, Page, Locator
+from playwright.async_api import (
+    async_playwright,
+    Page,
+    Locator,
+    TimeoutError as PlaywrightTimeoutError,
+)
 import anthropic
 
 load_dotenv()
 
+# Resource types not loaded during discovery. Stylesheets are kept: dropdown
+# probing clicks elements, which needs the real layout.
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+
+# First code fence in a model response (an unclosed one runs to the end)
+_FENCE_RE = re.compile(r"```(?:python)?[ \t]*\n(.*?)(?:```|\Z)", re.DOTALL)
+
+# Scripts evaluated in the page
+_EXTRACT_FIELDS_JS = """
+() => {
+    const fields = [];
+    // Elements already recorded as fields
+    const seen = new Set();
+
+    // Label text by the id it points to (first label wins), built once
+    // instead of a label[for] query per element
+    const labelFor = new Map();
+    document.querySelectorAll('label[for]').forEach(label => {
+        const id = label.getAttribute('for');
+        if (!labelFor.has(id)) labelFor.set(id, label.textContent.trim());
+    });
+
+    // Memoize per element; wrappers and their inputs are looked up twice
+    function memoize(fn) {
+        const cache = new WeakMap();
+        return el => {
+            if (!cache.has(el)) cache.set(el, fn(el));
+            return cache.get(el);
+        };
+    }
+
+    // Helper to get label for an element
+    const getLabel = memoize(el => {
+        // Check for associated label
+        if (el.id && labelFor.has(el.id)) return labelFor.get(el.id);
+        // Check parent label
+        const parentLabel = el.closest('label');
+        if (parentLabel) return parentLabel.textContent.trim();
+        // Check preceding label sibling
+        const prev = el.previousElementSibling;
+        if (prev && prev.tagName === 'LABEL') return prev.textContent.trim();
+        // Check placeholder or aria-label
+        return el.placeholder || el.getAttribute('aria-label') || el.name || el.id || '';
+    });
+
+    // ant-design select roots, collected once for getFieldType
+    const antSelects = new Set(document.querySelectorAll('.ant-select'));
+
+    // Helper to determine field type
+    function getFieldType(el) {
+        if (el.tagName === 'SELECT') return 'select';
+        if (el.tagName === 'TEXTAREA') return 'textarea';
+        if (el.type === 'checkbox') return 'checkbox';
+        if (el.type === 'radio') return 'radio';
+        if (el.type === 'file') return 'file';
+        if (el.type === 'email') return 'email';
+        if (el.type === 'tel') return 'phone';
+        if (el.type === 'number') return 'number';
+        if (el.type === 'date') return 'date';
+        if (el.type === 'password') return 'password';
+        // Check for searchable dropdown (common pattern)
+        if (el.getAttribute('role') === 'combobox' ||
+            el.classList.contains('ant-select')) return 'searchable_select';
+        // ant-design nests the input a few levels below the root
+        let parent = el.parentElement;
+        for (let depth = 0; parent && depth < 5; depth++) {
+            if (antSelects.has(parent)) return 'searchable_select';
+            parent = parent.parentElement;
+        }
+        return 'text';
+    }
+
+    // Helper to get CSS selector
+    const getSelector = memoize(el => {
+        if (el.id) return '#' + el.id;
+        if (el.name) return `[name="${el.name}"]`;
+        // Build a unique selector
+        let selector = el.tagName.toLowerCase();
+        if (el.className) {
+            selector += '.' + el.className.split(' ').filter(c => c).join('.');
+        }
+        return selector;
+    });
+
+    // Get all input elements
+    const inputs = document.querySelectorAll('input, textarea, select');
+
+    inputs.forEach(el => {
+        // Skip hidden and submit/button types
+        if (el.type === 'hidden' || el.type === 'submit' || el.type === 'button') return;
+
+        const field = {
+            field_name: getLabel(el),
+            field_type: getFieldType(el),
+            css_selector: getSelector(el),
+            id: el.id || null,
+            name: el.name || null,
+            is_required: el.required || el.getAttribute('aria-required') === 'true',
+            placeholder: el.placeholder || '',
+            is_searchable: el.getAttribute('role') === 'combobox' || el.type === 'search',
+            options: [],
+            accept: el.accept || null  // For file inputs
+        };
+
+        // Get options for regular select
+        if (el.tagName === 'SELECT') {
+            field.options = Array.from(el.options).map(opt => ({
+                value: opt.value,
+                text: opt.textContent.trim()
+            }));
+        }
+
+        seen.add(el);
+        fields.push(field);
+    });
+
+    // Also look for ant-design style selects (common in React apps)
+    document.querySelectorAll('.ant-select, [class*="select-wrapper"]').forEach(wrapper => {
+        const input = wrapper.querySelector('input');
+        if (input && !seen.has(input)) {
+            seen.add(input);
+            const label = getLabel(wrapper) || getLabel(input);
+            fields.push({
+                field_name: label,
+                field_type: 'searchable_select',
+                css_selector: getSelector(input),
+                id: input.id || null,
+                name: input.name || null,
+                is_required: input.required || wrapper.querySelector('[aria-required="true"]') !== null,
+                placeholder: input.placeholder || '',
+                is_searchable: true,
+                options: [],
+                wrapper_selector: getSelector(wrapper)
+            });
+        }
+    });
+
+    return fields;
+}
+"""
+
+_FIND_SUBMIT_JS = """
+() => {
+    // (":contains" is not valid CSS and made querySelector throw)
+    const btn = document.querySelector('button[type="submit"], input[type="submit"]');
+    if (btn) {
+        return {
+            text: btn.textContent?.trim() || btn.value || 'Submit',
+            css_selector: btn.id ? '#' + btn.id : 'button[type="submit"]'
+        };
+    }
+    // Fallback - find any button with submit-like text
+    const b = Array.from(document.querySelectorAll('button'))
+        .find(b => /submit|save|send/i.test(b.textContent));
+    if (b) {
+        return {
+            text: b.textContent.trim(),
+            css_selector: b.id ? '#' + b.id : `button:has-text("${b.textContent.trim()}")`
+        };
+    }
+    return null;
+}
+"""
+
+_OPTION_TEXTS_JS = """
+(selectors) => {
+    for (const s of selectors) {
+        const texts = Array.from(document.querySelectorAll(s))
+            .slice(0, 50)  // Limit to 50 options
+            .map(e => (e.textContent || '').trim())
+            .filter(Boolean);
+        if (texts.length) return texts;
+    }
+    return [];
+}
+"""
+
 
 class CostTracker:
     """Track API costs"""
 
-    # Pricing per 1M tokens (as of Dec 2024)
+    # USD per token as (input, output) (as of Dec 2024)
     PRICING = {
-        "claude-sonnet-4-5-20250929": {"input": 3.0, "output": 15.0},
-        "claude-opus-4-5-20250929": {"input": 15.0, "output": 75.0},
-        "claude-3-5-sonnet": {"input": 3.0, "output": 15.0},
-        "claude-3-opus": {"input": 15.0, "output": 75.0},
+        "claude-sonnet-4-5-20250929": (3.0e-6, 15.0e-6),
+        "claude-opus-4-5-20250929": (15.0e-6, 75.0e-6),
+        "claude-3-5-sonnet": (3.0e-6, 15.0e-6),
+        "claude-3-opus": (15.0e-6, 75.0e-6),
     }
+    DEFAULT_PRICING = (3.0e-6, 15.0e-6)
 
     def __init__(self):
         self.calls = []
@@ -36,10 +222,8 @@ class CostTracker:
         self.total_cost = 0.0
 
     def add_call(self, model: str, input_tokens: int, output_tokens: int):
-        pricing = self.PRICING.get(model, {"input": 3.0, "output": 15.0})
-        cost = (input_tokens * pricing["input"] / 1_000_000) + (
-            output_tokens * pricing["output"] / 1_000_000
-        )
+        input_price, output_price = self.PRICING.get(model, self.DEFAULT_PRICING)
+        cost = input_tokens * input_price + output_tokens * output_price
 
         self.calls.append(
             {
@@ -71,15 +255,59 @@ class SmartFormDiscovery:
     Only uses AI for generating the final scraper code.
     """
 
+    # Pages opened on the form to probe dropdowns concurrently
+    DROPDOWN_PAGES = 5
+
     def __init__(self, output_dir: str = "scrapers"):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.api_key = os.getenv("api_key")
         self.cost_tracker = CostTracker()
-        self.anthropic_client = anthropic.Anthropic(
-            api_key=self.api_key, base_url="https://ai.megallm.io"
+        # Keep idle connections for a minute (httpx default: 5s) so
+        # generations spaced out by discovery runs reuse the TLS connection
+        self.anthropic_client = anthropic.AsyncAnthropic(
+            api_key=self.api_key,
+            base_url="https://ai.megallm.io",
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60)
+            ),
         )
 
+        # Chromium shared by all discover_form calls, launched on first use
+        self._playwright = None
+        self._browser = None
+        self._headless = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def _ensure_browser(self, headless: bool):
+        """Return the shared browser, (re)launching it if needed"""
+        if self._browser is not None and self._headless != headless:
+            await self._browser.close()
+            self._browser = None
+
+        if self._browser is None:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=headless)
+            self._headless = headless
+
+        return self._browser
+
+    async def aclose(self):
+        """Close the shared browser and the API client's connections"""
+        await self.anthropic_client.close()
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
     async def discover_form(self, url: str, headless: bool = True) -> dict:
         """
         Use Playwright directly to discover form fields - NO AI TOKENS USED.
@@ -96,151 +324,68 @@ class SmartFormDiscovery:
             "notes": [],
         }
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=headless)
-            page = await browser.new_page()
+        # Only a fresh context per form; the browser itself is reused
+        browser = await self._ensure_browser(headless)
+        context = await browser.new_context()
+        await context.route("**/*", self._block_heavy_resources)
+        page = await context.new_page()
 
-            try:
-                print(f"  Navigating to {url[:60]}...")
-                await page.goto(url, wait_until="networkidle", timeout=30000)
-                await page.wait_for_timeout(2000)  # Let JS render
+        try:
+            print(f"  Navigating to {url[:60]}...")
+            await self._open_form(page, url)
 
-                # Get page title
-                form_structure["form_title"] = await page.title()
+            # Get page title
+            form_structure["form_title"] = await page.title()
 
-                # Find all form fields using JavaScript
-                fields = await self._extract_fields_js(page)
-                form_structure["sections"] = self._organize_into_sections(fields)
-                form_structure["total_fields"] = len(fields)
+            # Find all form fields using JavaScript
+            fields = await self._extract_fields_js(page)
+            form_structure["sections"] = self._organize_into_sections(fields)
+            form_structure["total_fields"] = len(fields)
 
-                # Find submit button
-                form_structure["submit_button"] = await self._find_submit_button(page)
+            # Find submit button
+            form_structure["submit_button"] = await self._find_submit_button(page)
 
-                # Discover dropdown options for select fields
-                await self._discover_dropdown_options(page, form_structure)
+            # Discover dropdown options for select fields
+            await self._discover_dropdown_options(page, fields)
 
-                print(f"  Found {len(fields)} fields")
+            print(f"  Found {len(fields)} fields")
 
-            except Exception as e:
-                form_structure["notes"].append(f"Discovery error: {str(e)}")
-                print(f"  Error: {e}")
+        except Exception as e:
+            form_structure["notes"].append(f"Discovery error: {str(e)}")
+            print(f"  Error: {e}")
 
-            finally:
-                await browser.close()
+        finally:
+            await context.close()
 
         return form_structure
 
-    async def _extract_fields_js(self, page: Page) -> list:
-        """Extract all form fields using JavaScript - efficient single call"""
-
-        js_code = """
-        () => {
-            const fields = [];
-
-            // Helper to get label for an element
-            function getLabel(el) {
-                // Check for associated label
-                if (el.id) {
-                    const label = document.querySelector(`label[for="${el.id}"]`);
-                    if (label) return label.textContent.trim();
-                }
-                // Check parent label
-                const parentLabel = el.closest('label');
-                if (parentLabel) return parentLabel.textContent.trim();
-                // Check preceding label sibling
-                const prev = el.previousElementSibling;
-                if (prev && prev.tagName === 'LABEL') return prev.textContent.trim();
-                // Check placeholder or aria-label
-                return el.placeholder || el.getAttribute('aria-label') || el.name || el.id || '';
-            }
-
-            // Helper to determine field type
-            function getFieldType(el) {
-                if (el.tagName === 'SELECT') return 'select';
-                if (el.tagName === 'TEXTAREA') return 'textarea';
-                if (el.type === 'checkbox') return 'checkbox';
-                if (el.type === 'radio') return 'radio';
-                if (el.type === 'file') return 'file';
-                if (el.type === 'email') return 'email';
-                if (el.type === 'tel') return 'phone';
-                if (el.type === 'number') return 'number';
-                if (el.type === 'date') return 'date';
-                if (el.type === 'password') return 'password';
-                // Check for searchable dropdown (common pattern)
-                if (el.getAttribute('role') === 'combobox' ||
-                    el.classList.contains('ant-select') ||
-                    el.closest('.ant-select')) return 'searchable_select';
-                return 'text';
-            }
-
-            // Helper to get CSS selector
-            function getSelector(el) {
-                if (el.id) return '#' + el.id;
-                if (el.name) return `[name="${el.name}"]`;
-                // Build a unique selector
-                let selector = el.tagName.toLowerCase();
-                if (el.className) {
-                    selector += '.' + el.className.split(' ').filter(c => c).join('.');
-                }
-                return selector;
-            }
-
-            // Get all input elements
-            const inputs = document.querySelectorAll('input, textarea, select');
-
-            inputs.forEach(el => {
-                // Skip hidden and submit/button types
-                if (el.type === 'hidden' || el.type === 'submit' || el.type === 'button') return;
-
-                const field = {
-                    field_name: getLabel(el),
-                    field_type: getFieldType(el),
-                    css_selector: getSelector(el),
-                    id: el.id || null,
-                    name: el.name || null,
-                    is_required: el.required || el.getAttribute('aria-required') === 'true',
-                    placeholder: el.placeholder || '',
-                    is_searchable: el.getAttribute('role') === 'combobox' || el.type === 'search',
-                    options: [],
-                    accept: el.accept || null  // For file inputs
-                };
-
-                // Get options for regular select
-                if (el.tagName === 'SELECT') {
-                    field.options = Array.from(el.options).map(opt => ({
-                        value: opt.value,
-                        text: opt.textContent.trim()
-                    }));
-                }
-
-                fields.push(field);
-            });
+    @staticmethod
+    async def _block_heavy_resources(route):
+        """Abort requests discovery doesn't need (images, media, fonts)"""
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
 
-            // Also look for ant-design style selects (common in React apps)
-            document.querySelectorAll('.ant-select, [class*="select-wrapper"]').forEach(wrapper => {
-                const input = wrapper.querySelector('input');
-                if (input && !fields.find(f => f.id === input.id)) {
-                    const label = getLabel(wrapper) || getLabel(input);
-                    fields.push({
-                        field_name: label,
-                        field_type: 'searchable_select',
-                        css_selector: getSelector(input),
-                        id: input.id || null,
-                        name: input.name || null,
-                        is_required: input.required || wrapper.querySelector('[aria-required="true"]') !== null,
-                        placeholder: input.placeholder || '',
-                        is_searchable: true,
-                        options: [],
-                        wrapper_selector: getSelector(wrapper)
-                    });
-                }
-            });
+    async def _open_form(self, page: Page, url: str):
+        """Navigate to the form and wait for it to render
 
-            return fields;
-        }
+        Waits for form controls to appear rather than for the network to go
+        quiet, which analytics beacons and long polling can delay for long.
         """
+        await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        try:
+            await page.wait_for_function(
+                "document.querySelectorAll('input, textarea, select').length > 0",
+                timeout=5000,
+            )
+        except PlaywrightTimeoutError:
+            # Extract whatever is there; the form may not use native controls
+            pass
 
-        return await page.evaluate(js_code)
+    async def _extract_fields_js(self, page: Page) -> list:
+        """Extract all form fields using JavaScript - efficient single call"""
+        return await page.evaluate(_EXTRACT_FIELDS_JS)
 
     def _organize_into_sections(self, fields: list) -> list:
         """Organize fields into sections (simple grouping for now)"""
@@ -250,47 +395,77 @@ class SmartFormDiscovery:
 
     async def _find_submit_button(self, page: Page) -> dict:
         """Find the submit button"""
-        js_code = """
-        () => {
-            const btn = document.querySelector('button[type="submit"], input[type="submit"], button:contains("Submit")');
-            if (btn) {
-                return {
-                    text: btn.textContent?.trim() || btn.value || 'Submit',
-                    css_selector: btn.id ? '#' + btn.id : 'button[type="submit"]'
-                };
-            }
-            // Fallback - find any button with submit-like text
-            const buttons = document.querySelectorAll('button');
-            for (const b of buttons) {
-                if (/submit|save|send/i.test(b.textContent)) {
-                    return {
-                        text: b.textContent.trim(),
-                        css_selector: b.id ? '#' + b.id : `button:has-text("${b.textContent.trim()}")`
-                    };
-                }
-            }
-            return null;
-        }
-        """
-        return await page.evaluate(js_code)
+        return await page.evaluate(_FIND_SUBMIT_JS)
 
-    async def _discover_dropdown_options(self, page: Page, form_structure: dict):
-        """Discover options for dropdown fields by clicking them"""
+    async def _discover_dropdown_options(self, page: Page, fields: list):
+        """Discover options for dropdown fields by clicking them
+
+        Dropdowns are probed concurrently, each on its own page of the form
+        (up to DROPDOWN_PAGES) so the clicks don't interfere.
+        """
         print("  Discovering dropdown options...")
 
-        for section in form_structure["sections"]:
-            for field in section["fields"]:
-                if (
-                    field["field_type"] in ["select", "searchable_select"]
-                    and not field["options"]
-                ):
-                    try:
-                        options = await self._get_dropdown_options(page, field)
-                        field["options"] = options
-                        if options:
-                            print(f"    {field['field_name']}: {len(options)} options")
-                    except Exception as e:
-                        field["notes"] = f"Could not extract options: {str(e)}"
+        dropdown_fields = [
+            field
+            for field in fields
+            # Native selects already have their options from the extractor
+            if field["field_type"] == "searchable_select"
+            and not field["options"]
+        ]
+        if not dropdown_fields:
+            return
+
+        # Dropdowns repeated under the same label and placeholder (e.g. State
+        # in several sections) are clicked once and share the options
+        groups = {}
+        for field in dropdown_fields:
+            key = (
+                (field["field_name"], field["placeholder"])
+                if field["field_name"]
+                else id(field)
+            )
+            groups.setdefault(key, []).append(field)
+        probed_fields = [same[0] for same in groups.values()]
+
+        extra_pages = []
+        try:
+            for _ in range(min(self.DROPDOWN_PAGES, len(probed_fields)) - 1):
+                extra_page = await page.context.new_page()
+                extra_pages.append(extra_page)
+            # Pages that fail to load are just left out of the pool
+            opened = await asyncio.gather(
+                *(self._open_form(p, page.url) for p in extra_pages),
+                return_exceptions=True,
+            )
+
+            pool = asyncio.Queue()
+            pool.put_nowait(page)
+            for p, error in zip(extra_pages, opened):
+                if error is None:
+                    pool.put_nowait(p)
+
+            async def probe(field: dict) -> list:
+                probe_page = await pool.get()
+                try:
+                    return await self._get_dropdown_options(probe_page, field)
+                finally:
+                    pool.put_nowait(probe_page)
+
+            results = await asyncio.gather(
+                *(probe(field) for field in probed_fields), return_exceptions=True
+            )
+        finally:
+            for extra_page in extra_pages:
+                await extra_page.close()
+
+        for same, options in zip(groups.values(), results):
+            for field in same:
+                if isinstance(options, Exception):
+                    field["notes"] = f"Could not extract options: {str(options)}"
+                    continue
+                field["options"] = [dict(option) for option in options]
+                if options:
+                    print(f"    {field['field_name']}: {len(options)} options")
 
     async def _get_dropdown_options(self, page: Page, field: dict) -> list:
         """Get options for a single dropdown by clicking it"""
@@ -313,15 +488,10 @@ class SmartFormDiscovery:
                 "[class*='option']",
             ]
 
-            for opt_selector in option_selectors:
-                opts = await page.locator(opt_selector).all()
-                if opts:
-                    for opt in opts[:50]:  # Limit to 50 options
-                        text = await opt.text_content()
-                        if text and text.strip():
-                            options.append(text.strip())
-                    if options:
-                        break
+            # Read the texts of the first matching pattern in one call
+            texts = await page.evaluate(_OPTION_TEXTS_JS, option_selectors)
+            # Same shape as the native select options from the extractor
+            options = [{"value": text, "text": text} for text in texts]
 
             # Close dropdown
             await page.keyboard.press("Escape")
@@ -332,7 +502,7 @@ class SmartFormDiscovery:
 
         return options
 
-    def generate_scraper(self, form_structure: dict, portal_name: str) -> str:
+    async def generate_scraper(self, form_structure: dict, portal_name: str) -> str:
         """Use AI to generate a Playwright scraper from the discovered structure"""
 
         print("\n[Generation] Using Claude to generate scraper code...")
@@ -340,26 +510,33 @@ class SmartFormDiscovery:
         prompt = f"""Generate a production-ready Playwright Python scraper for this form:
 
 ```json
-{json.dumps(form_structure, indent=2)}
+{orjson.dumps(form_structure, option=orjson.OPT_INDENT_2).decode()}
 ```
 
 Requirements:
 1. Class name: `{portal_name.title().replace('_', '')}FormFiller`
 2. Async Playwright-based
-3. Methods: `__init__(headless=True)`, `async start()`, `async fill_form(data: dict)`, `async submit()`, `async close()`, `async run(data: dict, submit=False)`
-4. Handle searchable dropdowns: click, type to search, wait for options, click matching option
-5. Handle cascading dropdowns (e.g., Sub Category depends on Category)
-6. Proper waits and error handling
-7. Logging for each step
-8. Include `if __name__ == "__main__"` with sample usage
+3. Methods: `__init__(headless=True, browser=None)`, `async start()`, `async fill_form(data: dict)`, `async submit()`, `async close()`, `async run(data: dict, submit=False)`. If a Playwright `browser` is passed in, `start()` reuses it and only opens a new context, and `close()` only closes that context
+4. `fill_form()` records the names of fields it could not fill in `self.fields_failed` (a list, empty when every field succeeded)
+5. Handle searchable dropdowns: click, type to search, wait for options, click matching option
+6. Handle cascading dropdowns (e.g., Sub Category depends on Category)
+7. Proper waits and error handling
+8. Logging for each step
+9. Include `if __name__ == "__main__"` with sample usage
 
 Generate ONLY Python code, no explanations."""
 
-        response = self.anthropic_client.messages.create(
+        # Stream the response so the connection isn't idle while the whole
+        # scraper is generated
+        chunks = []
+        async with self.anthropic_client.messages.stream(
             model="claude-sonnet-4-5-20250929",
             max_tokens=8000,
             messages=[{"role": "user", "content": prompt}],
-        )
+        ) as stream:
+            async for text in stream.text_stream:
+                chunks.append(text)
+            response = await stream.get_final_message()
 
         # Track cost
         self.cost_tracker.add_call(
@@ -368,33 +545,27 @@ Generate ONLY Python code, no explanations."""
             response.usage.output_tokens,
         )
 
-        code = response.content[0].text
+        code = "".join(chunks)
 
         # Clean up code block markers
-        if "```python" in code:
-            code = code.split("```python")[1].split("```")[0]
-        elif "```" in code:
-            code = code.split("```")[1].split("```")[0]
+        fence = _FENCE_RE.search(code)
+        if fence:
+            code = fence.group(1)
 
         return code.strip()
 
-    def save_scraper(self, code: str, portal_name: str, form_structure: dict) -> Path:
+    async def save_scraper(
+        self, code: str, portal_name: str, form_structure: dict
+    ) -> Path:
         """Save the generated scraper and metadata"""
 
         portal_dir = self.output_dir / portal_name
         portal_dir.mkdir(exist_ok=True)
 
-        # Save scraper
         scraper_path = portal_dir / f"{portal_name}_scraper.py"
-        with open(scraper_path, "w") as f:
-            f.write(code)
-
-        # Save structure
         structure_path = portal_dir / f"{portal_name}_structure.json"
-        with open(structure_path, "w") as f:
-            json.dump(form_structure, f, indent=2)
 
-        # Save metadata with costs
+        # Metadata with costs
         metadata = {
             "portal_name": portal_name,
             "generated_at": datetime.now().isoformat(),
@@ -403,11 +574,26 @@ Generate ONLY Python code, no explanations."""
             "costs": self.cost_tracker.summary(),
         }
         metadata_path = portal_dir / "metadata.json"
-        with open(metadata_path, "w") as f:
-            json.dump(metadata, f, indent=2)
+
+        # Write scraper, structure and metadata concurrently
+        await asyncio.gather(
+            self._write_file(scraper_path, code.encode()),
+            self._write_file(
+                structure_path,
+                orjson.dumps(form_structure, option=orjson.OPT_INDENT_2),
+            ),
+            self._write_file(
+                metadata_path, orjson.dumps(metadata, option=orjson.OPT_INDENT_2)
+            ),
+        )
 
         return scraper_path
 
+    @staticmethod
+    async def _write_file(path: Path, data: bytes):
+        async with aiofiles.open(path, "wb") as f:
+            await f.write(data)
+
     async def generate_from_url(
         self, url: str, portal_name: str, headless: bool = True
     ) -> Path:
@@ -425,11 +611,13 @@ Generate ONLY Python code, no explanations."""
 
         # Step 2: Generate scraper (uses AI - costs tokens)
         print("\n[2/3] Generating scraper (Claude - costs tokens)...")
-        scraper_code = self.generate_scraper(form_structure, portal_name)
+        scraper_code = await self.generate_scraper(form_structure, portal_name)
 
         # Step 3: Save
         print("\n[3/3] Saving files...")
-        scraper_path = self.save_scraper(scraper_code, portal_name, form_structure)
+        scraper_path = await self.save_scraper(
+            scraper_code, portal_name, form_structure
+        )
 
         # Summary
         costs = self.cost_tracker.summary()
@@ -447,16 +635,21 @@ Generate ONLY Python code, no explanations."""
 
 async def main():
     """Test the smart discovery"""
-    discovery = SmartFormDiscovery()
-
     url = "https://mcd.everythingcivic.com/citizen/createissue?app_id=U2FsdGVkX180J3mGnJmT5QpgtPjhfjtzyXAAccBUxGU%3D&api_key=e34ba86d3943bd6db9120313da011937189e6a9625170905750f649395bcd68312cf10d264c9305d57c23688cc2e5120"
 
-    scraper_path = await discovery.generate_from_url(
-        url=url, portal_name="mcd_delhi", headless=True
-    )
+    async with SmartFormDiscovery() as discovery:
+        scraper_path = await discovery.generate_from_url(
+            url=url, portal_name="mcd_delhi", headless=True
+        )
 
     print(f"\nGenerated: {scraper_path}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop is not available on Windows; fall back to the default loop
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -4,10 +4,20 @@ Tests submission, field validation, and form behavior
 """
 
 import asyncio
+import json
 import logging
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass, field
-from playwright.async_api import async_playwright, Page, Browser
+import re
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, field, fields as dataclass_fields
+from playwright.async_api import (
+    async_playwright,
+    Page,
+    Browser,
+    BrowserContext,
+    Error as PlaywrightError,
+    TimeoutError as PlaywrightTimeoutError,
+)
 
 from agents.base_agent import BaseAgent
 from agents.form_discovery_agent import FormSchema, FormField
@@ -16,8 +26,42 @@ from utils.adaptive_discovery import ai_discovery
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+TEXTAREA_TEST_VALUE = "This is a test complaint for automated testing purposes."
+DEFAULT_TEST_VALUE = "Test Value"  # Generic fallback - AI generates better data when available
+
+# Elements that typically carry client-side validation messages
+ERROR_SELECTOR = ".error, .invalid, .text-danger"
+BROAD_ERROR_SELECTOR = ERROR_SELECTOR + ', [class*="error"], [class*="invalid"]'
+
+SCREENSHOT_DIR = Path("dashboard/static/screenshots")
+BEFORE_SUBMIT_SCREENSHOT = str(SCREENSHOT_DIR / "before_submit.jpg")
+AFTER_SUBMIT_SCREENSHOT = str(SCREENSHOT_DIR / "after_submit.jpg")
+
+# Option count of each <select> selector (0 when missing or not a select)
+_OPTION_COUNTS_JS = """
+(selectors) => selectors.map((sel) => {
+    try {
+        const select = document.querySelector(sel);
+        return select && select.options ? select.options.length : 0;
+    } catch (e) {
+        return 0;
+    }
+})
+"""
+
+# Keyword arguments accepted by FormField, used to filter serialized field dicts
+_FORM_FIELD_KEYS = frozenset(f.name for f in dataclass_fields(FormField))
 
-@dataclass
+# Common patterns for tracking IDs, labelled IDs take priority over bare codes.
+# Sources for case-insensitive JS RegExps, matched in the page (see
+# _extract_tracking_id)
+_TRACKING_PATTERNS = (
+    r"(?:complaint|tracking|reference)\s*(?:id|number|no\.?)\s*:?\s*([A-Z0-9-]+)",
+    r"([A-Z]{2,5}\d{5,10})",  # Generic pattern like RMC12345
+)
+
+
+@dataclass(slots=True)
 class TestResult:
     """Result of a single test"""
 
@@ -29,7 +73,7 @@ class TestResult:
     screenshot_path: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationResults:
     """Complete validation results for a form schema"""
 
@@ -48,11 +92,24 @@ class TestValidationAgent(BaseAgent):
     Agent that validates form schemas through systematic testing
     """
 
+    # Playwright driver and browsers shared by every instance and retry, keyed by
+    # (browser_type, headless); released by shutdown(). All of it belongs to the
+    # event loop in _shared_loop, see _bind_shared_state()
+    _shared_loop: Optional[asyncio.AbstractEventLoop] = None
+    _shared_lock: Optional[asyncio.Lock] = None
+    _shared_playwright = None
+    _shared_browsers: Dict[Tuple[str, bool], Browser] = {}
+
     def __init__(self, headless: bool = False, browser_type: str = "firefox"):
         super().__init__(name="TestValidationAgent", max_attempts=3)
         self.headless = headless
         self.browser_type = browser_type  # "chromium", "firefox", or "webkit"
         self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = None
+        # Test value generator per (field name, field type), picked once per field
+        self._field_generators: Dict[Tuple[str, str], Callable[[], str]] = {}
+        # Detected dropdown widget type per selector, reused across fills
+        self._dropdown_types: Dict[str, str] = {}
         self.playwright = None
 
     async def _execute_attempt(self, task: Dict[str, Any]) -> Dict[str, Any]:
@@ -68,6 +125,9 @@ class TestValidationAgent(BaseAgent):
 
         # Filter out non-user-facing fields BEFORE testing
         schema = self._filter_user_facing_fields(schema)
+        # Generators and detected dropdown types are only valid for one schema
+        self._field_generators.clear()
+        self._dropdown_types.clear()
 
         logger.info(
             f"🧪 [{self.name}] Testing form with {len(schema.fields)} user-facing fields"
@@ -79,45 +139,46 @@ class TestValidationAgent(BaseAgent):
         try:
             results = ValidationResults(total_tests=0, passed=0, failed=0)
 
-            # Test Suite with timeouts
-            import time
-
-            start_time = time.time()
+            # Test Suite with a single wall-clock deadline
+            loop = asyncio.get_running_loop()
             max_validation_time = 180  # 3 minutes max for all validation
+            deadline = loop.time() + max_validation_time
 
-            await self._test_empty_submission(schema, results)
+            # These two rewrite field.required / field.type, which the later
+            # phases read while filling the form, so they run first and in order
+            for phase in (self._test_empty_submission, self._test_field_types):
+                await self._run_phase(phase, schema, results, deadline)
 
-            if time.time() - start_time > max_validation_time:
+            if loop.time() >= deadline:
                 logger.warning(
                     f"⏰ Validation timeout reached, skipping remaining tests"
                 )
-                results.test_results.append(
-                    TestResult(
-                        test_name="timeout_check",
-                        passed=False,
-                        message="Validation timeout - skipped remaining tests",
-                        warnings=["Tests took too long"],
-                    )
+                self._record_timeout(
+                    results,
+                    "timeout_check",
+                    "Validation timeout - skipped remaining tests",
                 )
-                results.total_tests += 1
-                results.failed += 1
             else:
-                await self._test_required_fields(schema, results)
-
-            if time.time() - start_time > max_validation_time:
-                logger.warning(f"⏰ Validation timeout reached")
-            else:
-                await self._test_field_types(schema, results)
-
-            if time.time() - start_time > max_validation_time:
-                logger.warning(f"⏰ Validation timeout reached")
-            else:
-                await self._test_cascading_dropdowns(schema, results)
-
-            if time.time() - start_time > max_validation_time:
-                logger.warning(f"⏰ Validation timeout reached")
-            else:
-                await self._test_full_submission(schema, results)
+                # Remaining phases only read the corrected schema (required-field
+                # checks clear flags the full submission doesn't use), so run them
+                # concurrently, each writing to its own result shard
+                phases = [
+                    self._test_required_fields,
+                    self._test_cascading_dropdowns,
+                    self._test_full_submission,
+                ]
+                shards = [
+                    ValidationResults(total_tests=0, passed=0, failed=0)
+                    for _ in phases
+                ]
+                await asyncio.gather(
+                    *(
+                        self._run_phase(phase, schema, shard, deadline)
+                        for phase, shard in zip(phases, shards)
+                    )
+                )
+                for shard in shards:
+                    self._merge_results(results, shard)
 
             # Calculate confidence
             results.confidence_score = (
@@ -158,31 +219,139 @@ class TestValidationAgent(BaseAgent):
         finally:
             await self._cleanup_browser()
 
+    async def _run_phase(
+        self,
+        phase: Callable[[FormSchema, ValidationResults], Awaitable[None]],
+        schema: FormSchema,
+        results: ValidationResults,
+        deadline: float,
+    ):
+        """Run one test phase, cancelling it if it outlives the validation deadline"""
+        test_name = phase.__name__.removeprefix("_test_")
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            self._record_timeout(
+                results, test_name, "Validation timeout - test skipped"
+            )
+            return
+
+        try:
+            await asyncio.wait_for(phase(schema, results), timeout=remaining)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏰ Validation timeout reached, cancelled {test_name}")
+            self._record_timeout(
+                results, test_name, "Validation timeout - test cancelled"
+            )
+
+    @staticmethod
+    def _record_timeout(results: ValidationResults, test_name: str, message: str):
+        """Record a test that ran out of validation time as failed"""
+        results.test_results.append(
+            TestResult(
+                test_name=test_name,
+                passed=False,
+                message=message,
+                warnings=["Tests took too long"],
+            )
+        )
+        results.total_tests += 1
+        results.failed += 1
+
+    @staticmethod
+    def _merge_results(results: ValidationResults, shard: ValidationResults):
+        """Fold a per-test result shard into the overall results"""
+        results.total_tests += shard.total_tests
+        results.passed += shard.passed
+        results.failed += shard.failed
+        results.test_results.extend(shard.test_results)
+
+    @classmethod
+    def _bind_shared_state(cls):
+        """Start over with fresh shared state when running on a different event loop"""
+        loop = asyncio.get_running_loop()
+        if cls._shared_loop is not loop:
+            # Driver and browsers of a previous loop can't be used (or closed) here
+            cls._shared_loop = loop
+            cls._shared_lock = asyncio.Lock()
+            cls._shared_playwright = None
+            cls._shared_browsers = {}
+
     async def _init_browser(self):
-        """Initialize Playwright browser"""
-        if not self.playwright:
-            self.playwright = await async_playwright().start()
-            # Select browser type based on configuration
-            if self.browser_type == "firefox":
-                browser_launcher = self.playwright.firefox
-            elif self.browser_type == "webkit":
-                browser_launcher = self.playwright.webkit
-            else:
-                browser_launcher = self.playwright.chromium
+        """Initialize Playwright browser (launched once, then shared across runs)"""
+        cls = TestValidationAgent
+        cls._bind_shared_state()
+        key = (self.browser_type, self.headless)
+        async with cls._shared_lock:
+            if cls._shared_playwright is None:
+                cls._shared_playwright = await async_playwright().start()
+
+            browser = cls._shared_browsers.get(key)
+            if browser is None or not browser.is_connected():
+                # Select browser type based on configuration
+                if self.browser_type == "firefox":
+                    browser_launcher = cls._shared_playwright.firefox
+                elif self.browser_type == "webkit":
+                    browser_launcher = cls._shared_playwright.webkit
+                else:
+                    browser_launcher = cls._shared_playwright.chromium
 
-            self.browser = await browser_launcher.launch(
-                headless=self.headless,
-                args=["--no-sandbox"] if self.browser_type == "chromium" else [],
+                browser = await browser_launcher.launch(
+                    headless=self.headless,
+                    args=["--no-sandbox"] if self.browser_type == "chromium" else [],
+                )
+                cls._shared_browsers[key] = browser
+
+        self.playwright = cls._shared_playwright
+        self.browser = browser
+        # One context for every test phase; tests only open/close pages
+        self.context = await self.browser.new_context()
+
+    async def _open_page(self, isolated: bool = False) -> Page:
+        """Open a test page, in its own context when it may run alongside other submissions"""
+        if isolated:
+            context = await self.browser.new_context()
+            return await context.new_page()
+        return await self.context.new_page()
+
+    async def _close_page(self, page: Page, isolated: bool = False):
+        """Close a test page and, for isolated pages, the context it was opened in"""
+        if isolated:
+            await page.context.close()
+        else:
+            await page.close()
+
+    async def _reset_session(self, page: Page):
+        """Clear cookies and web storage so the next test starts from a clean session"""
+        try:
+            await self.context.clear_cookies()
+            await page.evaluate(
+                "() => { localStorage.clear(); sessionStorage.clear(); }"
             )
+        except Exception as e:
+            logger.debug(f"Session reset failed: {e}")
 
     async def _cleanup_browser(self):
-        """Clean up browser resources"""
-        if self.browser:
-            await self.browser.close()
-            self.browser = None
-        if self.playwright:
-            await self.playwright.stop()
-            self.playwright = None
+        """Clean up per-run browser resources (the shared browser stays up)"""
+        if self.context:
+            await self.context.close()
+            self.context = None
+        self.browser = None
+        self.playwright = None
+
+    @classmethod
+    async def shutdown(cls):
+        """Close the shared browsers and Playwright driver (call at process teardown)"""
+        cls._bind_shared_state()
+        async with cls._shared_lock:
+            for browser in cls._shared_browsers.values():
+                try:
+                    await browser.close()
+                except Exception as e:
+                    logger.debug(f"Browser close failed: {e}")
+            cls._shared_browsers.clear()
+            if cls._shared_playwright is not None:
+                await cls._shared_playwright.stop()
+                cls._shared_playwright = None
 
     async def _test_empty_submission(
         self, schema: FormSchema, results: ValidationResults
@@ -190,12 +359,10 @@ class TestValidationAgent(BaseAgent):
         """Test 1: Submit empty form to verify validation"""
         logger.info("🧪 Test 1: Empty form submission")
 
-        context = await self.browser.new_context()
-        page = await context.new_page()
+        page = await self._open_page()
 
         try:
             await page.goto(schema.url, wait_until="networkidle", timeout=30000)
-            await asyncio.sleep(1)
 
             # Try to submit without filling anything
             submit_selector = schema.submit_button.get("selector", "")
@@ -238,7 +405,7 @@ class TestValidationAgent(BaseAgent):
             try:
                 await page.click(submit_selector, timeout=5000)
                 submit_clicked = True
-                await asyncio.sleep(1)
+                await self._wait_for_selector_quietly(page, BROAD_ERROR_SELECTOR)
             except Exception as click_error:
                 error_msg = str(click_error).lower()
                 # If timeout or disabled, that's GOOD (validation working)
@@ -267,16 +434,8 @@ class TestValidationAgent(BaseAgent):
                 return
 
             # Button was clicked - check for validation errors
-            errors = await page.evaluate(
-                """
-                () => {
-                    const errorElements = document.querySelectorAll(
-                        '.error, .invalid, .text-danger, [class*="error"], [class*="invalid"]'
-                        );
-                    return Array.from(errorElements).map(e => e.textContent.trim()).filter(t => t);
-                }
-            """
-            )
+            texts = await page.locator(BROAD_ERROR_SELECTOR).all_text_contents()
+            errors = [t.strip() for t in texts if t.strip()]
 
             if errors:
                 # Good! Form has client-side validation
@@ -288,12 +447,14 @@ class TestValidationAgent(BaseAgent):
                 )
 
                 # Update required fields based on errors
+                field_keys = [
+                    (field.label.casefold(), field.name.casefold(), field)
+                    for field in schema.fields
+                ]
                 for error in errors:
-                    for field in schema.fields:
-                        if (
-                            field.label.lower() in error.lower()
-                            or field.name.lower() in error.lower()
-                        ):
+                    error_cf = error.casefold()
+                    for label_cf, name_cf, field in field_keys:
+                        if label_cf in error_cf or name_cf in error_cf:
                             if not field.required:
                                 logger.info(f"   📝 Marking {field.label} as required")
                                 field.required = True
@@ -327,7 +488,8 @@ class TestValidationAgent(BaseAgent):
             results.failed += 1
 
         finally:
-            await context.close()
+            await self._reset_session(page)
+            await self._close_page(page)
 
     async def _test_required_fields(
         self, schema: FormSchema, results: ValidationResults
@@ -350,8 +512,7 @@ class TestValidationAgent(BaseAgent):
             results.failed += 1
             return
 
-        context = await self.browser.new_context()
-        page = await context.new_page()
+        page = await self._open_page(isolated=True)
 
         try:
             await page.goto(schema.url, wait_until="networkidle", timeout=30000)
@@ -365,27 +526,18 @@ class TestValidationAgent(BaseAgent):
                     )
 
                     await self._fill_form(page, schema, test_data)
-                    await asyncio.sleep(0.5)
 
                     # Try submit
                     await page.click(
                         schema.submit_button.get("selector", ""), timeout=5000
                     )
-                    await asyncio.sleep(1)
+                    await self._wait_for_selector_quietly(page, ERROR_SELECTOR)
 
                     # Check for error about this field
-                    errors = await page.evaluate(
-                        """
-                        () => {
-                            const errorElements = document.querySelectorAll('.error, .invalid, .text-danger');
-                            return Array.from(errorElements).map(e => e.textContent.trim());
-                        }
-                    """
-                    )
+                    errors = await page.locator(ERROR_SELECTOR).all_text_contents()
 
-                    field_mentioned = any(
-                        field.label.lower() in err.lower() for err in errors
-                    )
+                    label_cf = field.label.casefold()
+                    field_mentioned = any(label_cf in err.casefold() for err in errors)
 
                     if field_mentioned:
                         logger.info(
@@ -395,8 +547,11 @@ class TestValidationAgent(BaseAgent):
                         logger.warning(f"   ⚠️ {field.label} may not be required")
                         field.required = False  # Update schema
 
-                    # Reload for next test
-                    await page.goto(schema.url, wait_until="networkidle", timeout=30000)
+                    # Reload for the next field; rendered errors and validator
+                    # state belong to the page, so they are not removed by hand
+                    await page.goto(
+                        schema.url, wait_until="domcontentloaded", timeout=30000
+                    )
 
                 except Exception as e:
                     logger.warning(f"Could not test {field.label}: {e}")
@@ -424,14 +579,13 @@ class TestValidationAgent(BaseAgent):
             results.failed += 1
 
         finally:
-            await context.close()
+            await self._close_page(page, isolated=True)
 
     async def _test_field_types(self, schema: FormSchema, results: ValidationResults):
         """Test 3: Verify field type detection"""
         logger.info("🧪 Test 3: Field type validation")
 
-        context = await self.browser.new_context()
-        page = await context.new_page()
+        page = await self._open_page()
 
         try:
             await page.goto(schema.url, wait_until="networkidle", timeout=30000)
@@ -444,46 +598,52 @@ class TestValidationAgent(BaseAgent):
                 f"   Checking {max_fields_to_check} of {len(schema.fields)} fields"
             )
 
-            for field in schema.fields[:max_fields_to_check]:
-                try:
-                    if field.selector:
-                        # Get actual field type from DOM
-                        actual_type = await page.evaluate(
-                            f"""
-                            () => {{
-                                const elem = document.querySelector('{field.selector}');
-                                if (!elem) return null;
-                                return elem.tagName === 'SELECT' ? 'dropdown' :
-                                       elem.tagName === 'TEXTAREA' ? 'textarea' :
-                                       elem.type || 'text';
-                            }}
-                        """
-                        )
+            fields_to_check = [
+                f for f in schema.fields[:max_fields_to_check] if f.selector
+            ]
 
-                        if actual_type:
-                            # Normalize type names
-                            type_map = {
-                                "select-one": "dropdown",
-                                "text": "text",
-                                "email": "text",
-                                "tel": "text",
-                                "file": "file",
-                                "textarea": "textarea",
-                            }
+            # Get actual field types from DOM in a single round-trip
+            actual_types = await page.evaluate(
+                """
+                (selectors) => selectors.map(s => {
+                    try {
+                        const elem = document.querySelector(s);
+                        if (!elem) return null;
+                        return elem.tagName === 'SELECT' ? 'dropdown' :
+                               elem.tagName === 'TEXTAREA' ? 'textarea' :
+                               elem.type || 'text';
+                    } catch (e) {
+                        return null;
+                    }
+                })
+            """,
+                [f.selector for f in fields_to_check],
+            )
 
-                            actual_normalized = type_map.get(actual_type, actual_type)
-                            field_normalized = type_map.get(field.type, field.type)
+            for field, actual_type in zip(fields_to_check, actual_types):
+                if not actual_type:
+                    continue
+
+                # Normalize type names
+                type_map = {
+                    "select-one": "dropdown",
+                    "text": "text",
+                    "email": "text",
+                    "tel": "text",
+                    "file": "file",
+                    "textarea": "textarea",
+                }
 
-                            if actual_normalized == field_normalized:
-                                verified_count += 1
-                            else:
-                                logger.warning(
-                                    f"   ⚠️ {field.label}: expected {field.type}, got {actual_type}"
-                                )
-                                field.type = actual_normalized
+                actual_normalized = type_map.get(actual_type, actual_type)
+                field_normalized = type_map.get(field.type, field.type)
 
-                except Exception as e:
-                    logger.warning(f"Could not verify {field.label}: {e}")
+                if actual_normalized == field_normalized:
+                    verified_count += 1
+                else:
+                    logger.warning(
+                        f"   ⚠️ {field.label}: expected {field.type}, got {actual_type}"
+                    )
+                    field.type = actual_normalized
 
             test = TestResult(
                 test_name="field_types",
@@ -511,7 +671,7 @@ class TestValidationAgent(BaseAgent):
             results.failed += 1
 
         finally:
-            await context.close()
+            await self._close_page(page)
 
     async def _test_cascading_dropdowns(
         self, schema: FormSchema, results: ValidationResults
@@ -533,59 +693,45 @@ class TestValidationAgent(BaseAgent):
             results.passed += 1
             return
 
-        context = await self.browser.new_context()
-        page = await context.new_page()
+        page = await self._open_page()
 
         try:
             await page.goto(schema.url, wait_until="networkidle", timeout=30000)
 
-            verified = 0
+            fields_by_name = {f.name: f for f in schema.fields}
+            relationships = []
             for field in cascading_fields:
-                try:
-                    parent_field = next(
-                        (f for f in schema.fields if f.name == field.depends_on), None
-                    )
-                    if not parent_field or not parent_field.options:
-                        continue
-
-                    logger.info(f"   Testing: {parent_field.label} → {field.label}")
+                parent_field = fields_by_name.get(field.depends_on)
+                if parent_field and parent_field.options:
+                    relationships.append((parent_field, field))
+
+            # Snapshot every child on the untouched page in one round-trip, so a
+            # parent selected for an earlier child can't pre-populate a later one
+            counts_before = await page.evaluate(
+                _OPTION_COUNTS_JS, [child.selector for _, child in relationships]
+            )
 
-                    # Get child options before parent selection
-                    options_before = await page.evaluate(
-                        f"""
-                        () => {{
-                            const select = document.querySelector('{field.selector}');
-                            return select ? Array.from(select.options).map(o => o.text) : [];
-                        }}
-                    """
-                    )
+            verified = 0
+            for (parent_field, field), before in zip(relationships, counts_before):
+                logger.info(f"   Testing: {parent_field.label} → {field.label}")
 
-                    # Select parent
+                try:
+                    # A real selection, so AutoPostBack parents post back as usual
                     await page.select_option(
                         parent_field.selector, parent_field.options[0], timeout=3000
                     )
-                    await asyncio.sleep(1)  # Wait for AJAX
-
-                    # Get child options after
-                    options_after = await page.evaluate(
-                        f"""
-                        () => {{
-                            const select = document.querySelector('{field.selector}');
-                            return select ? Array.from(select.options).map(o => o.text) : [];
-                        }}
-                    """
+                    after = await self._wait_for_child_options(
+                        page, field.selector, before
                     )
-
-                    if len(options_after) > len(options_before):
-                        logger.info(
-                            f"   ✅ Cascading confirmed: {len(options_before)} → {len(options_after)}"
-                        )
-                        verified += 1
-                    else:
-                        logger.warning(f"   ⚠️ Cascading not detected")
-
                 except Exception as e:
                     logger.warning(f"Could not test cascading for {field.label}: {e}")
+                    continue
+
+                if after > before:
+                    logger.info(f"   ✅ Cascading confirmed: {before} → {after}")
+                    verified += 1
+                else:
+                    logger.warning(f"   ⚠️ Cascading not detected")
 
             test = TestResult(
                 test_name="cascading_dropdowns",
@@ -613,7 +759,7 @@ class TestValidationAgent(BaseAgent):
             results.failed += 1
 
         finally:
-            await context.close()
+            await self._close_page(page)
 
     async def _test_full_submission(
         self, schema: FormSchema, results: ValidationResults
@@ -621,8 +767,7 @@ class TestValidationAgent(BaseAgent):
         """Test 5: Full form submission with valid data"""
         logger.info("🧪 Test 5: Full submission")
 
-        context = await self.browser.new_context()
-        page = await context.new_page()
+        page = await self._open_page(isolated=True)
 
         try:
             await page.goto(schema.url, wait_until="networkidle", timeout=30000)
@@ -632,10 +777,10 @@ class TestValidationAgent(BaseAgent):
 
             # Fill form
             await self._fill_form(page, schema, test_data)
-            await asyncio.sleep(1)
 
-            # Take screenshot before submit
-            await page.screenshot(path="dashboard/static/screenshots/before_submit.png")
+            # Take screenshot before submit (only needed when debugging)
+            if logger.isEnabledFor(logging.DEBUG):
+                await self._save_screenshot(page, BEFORE_SUBMIT_SCREENSHOT)
 
             # Submit - with fallback for missing/wrong submit button
             submit_selector = schema.submit_button.get("selector", "")
@@ -673,10 +818,13 @@ class TestValidationAgent(BaseAgent):
                         )
                     except:
                         logger.error("   ❌ Could not find any clickable submit button")
-            await asyncio.sleep(2)
+            try:
+                await page.wait_for_load_state("networkidle", timeout=5000)
+            except PlaywrightTimeoutError:
+                pass
 
             # Take screenshot after submit
-            await page.screenshot(path="dashboard/static/screenshots/after_submit.png")
+            await self._save_screenshot(page, AFTER_SUBMIT_SCREENSHOT)
 
             # Use AI Vision to detect success/error (NO KEYWORD MATCHING)
             ai_result = await ai_discovery.detect_success_or_error(page)
@@ -687,14 +835,21 @@ class TestValidationAgent(BaseAgent):
             
             if status == "success":
                 logger.info("   ✅ AI detected form submission successful!")
+                if not tracking_id:
+                    try:
+                        tracking_id = await self._extract_tracking_id(page)
+                    except Exception as e:
+                        logger.debug(f"Tracking ID extraction failed: {e}")
+                message = "Form submission successful"
                 if tracking_id:
                     logger.info(f"   📋 Tracking ID: {tracking_id}")
+                    message += f" (tracking ID: {tracking_id})"
 
                 test = TestResult(
                     test_name="full_submission",
                     passed=True,
-                    message="Form submission successful",
-                    screenshot_path="dashboard/static/screenshots/after_submit.png",
+                    message=message,
+                    screenshot_path=AFTER_SUBMIT_SCREENSHOT,
                 )
             elif status == "error":
                 logger.warning(f"   ❌ AI detected submission errors: {errors}")
@@ -703,7 +858,7 @@ class TestValidationAgent(BaseAgent):
                     passed=False,
                     message="Submission failed with errors",
                     errors=errors,
-                    screenshot_path="dashboard/static/screenshots/after_submit.png",
+                    screenshot_path=AFTER_SUBMIT_SCREENSHOT,
                 )
             else:
                 # Unknown status - AI couldn't determine
@@ -713,7 +868,7 @@ class TestValidationAgent(BaseAgent):
                     passed=False,
                     message="Submission status unclear",
                     warnings=["AI could not determine if submission succeeded"],
-                    screenshot_path="dashboard/static/screenshots/after_submit.png",
+                    screenshot_path=AFTER_SUBMIT_SCREENSHOT,
                 )
 
             results.test_results.append(test)
@@ -736,23 +891,72 @@ class TestValidationAgent(BaseAgent):
             results.failed += 1
 
         finally:
-            await context.close()
+            await self._close_page(page, isolated=True)
+
+    async def _save_screenshot(self, page: Page, path: str):
+        """Capture a viewport JPEG and write it off the event loop"""
+        screenshot = await page.screenshot(type="jpeg", quality=60, full_page=False)
+
+        def write():
+            SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
+            Path(path).write_bytes(screenshot)
+
+        await asyncio.to_thread(write)
+
+    async def _wait_for_child_options(
+        self, page: Page, selector: str, before: int, timeout: int = 3000
+    ) -> int:
+        """
+        Wait for a child dropdown to gain options after its parent changed
+
+        AJAX cascades repopulate the child in place; server-side ones (ASP.NET
+        AutoPostBack) load a new document, which is waited for before re-reading.
+        """
+        try:
+            await page.wait_for_function(
+                """
+                ([sel, before]) => {
+                    const select = document.querySelector(sel);
+                    return !!select && !!select.options && select.options.length > before;
+                }
+            """,
+                arg=[selector, before],
+                timeout=timeout,
+            )
+        except PlaywrightTimeoutError:
+            pass
+        except PlaywrightError:
+            # Execution context destroyed by the postback navigation
+            await page.wait_for_load_state("domcontentloaded", timeout=30000)
+
+        counts = await page.evaluate(_OPTION_COUNTS_JS, [selector])
+        return counts[0]
+
+    async def _wait_for_selector_quietly(
+        self, page: Page, selector: str, timeout: int = 3000
+    ):
+        """Wait for a selector to become visible; a timeout just means it never showed up"""
+        try:
+            await page.wait_for_selector(selector, state="visible", timeout=timeout)
+        except PlaywrightTimeoutError:
+            pass
 
     async def _fill_form(self, page: Page, schema: FormSchema, data: Dict[str, Any]):
         """Helper: Fill form with provided data - uses AI generated code or fallback handlers."""
-        for field in schema.fields:
-            if field.name not in data:
+        plain_fields = []
+        fields_by_name = {f.name: f for f in schema.fields}
+        # Test data is built in schema order, so this still fills parents first
+        for name, value in data.items():
+            field = fields_by_name.get(name)
+            if field is None:
                 continue
 
-            value = data[field.name]
-
             try:
                 # 1. Try AI-generated interaction code first
                 if field.interaction_code:
                     logger.info(f"🤖 Using AI driver for {field.label}")
                     success = await self._execute_interaction_code(page, field.interaction_code, value, field)
                     if success:
-                        await asyncio.sleep(0.5)
                         try:
                             await page.wait_for_load_state("networkidle", timeout=2000)
                         except:
@@ -776,95 +980,64 @@ class TestValidationAgent(BaseAgent):
                     # After selecting any dropdown, wait briefly and check if
                     # other dropdowns got enabled/populated (cascade detection by behavior)
                     if success:
-                        await asyncio.sleep(0.5)  # Brief wait to check for DOM changes
                         try:
                             await page.wait_for_load_state("networkidle", timeout=3000)
                         except Exception:
                             pass
 
-                elif field.type == "textarea":
-                    await self._fill_text_input(page, field.selector, value)
                 elif field.type == "file":
                     # Skip file uploads in testing for now
                     pass
-                elif "number" in field.selector or 'type="number"' in str(field):
-                    # Handle number inputs specially
-                    await page.evaluate(
-                        f"""
-                        (value) => {{
-                            const input = document.querySelector('{field.selector}');
-                            if (input) {{
-                                input.value = value;
-                                input.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                                input.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                            }}
-                        }}
-                    """,
-                        str(value),
-                    )
                 else:
-                    await self._fill_text_input(page, field.selector, value)
+                    # Text, textarea and number inputs are filled together below
+                    plain_fields.append((field.selector, str(value)))
 
             except Exception as e:
                 logger.warning(f"Could not fill {field.label}: {e}")
 
-    async def _fill_text_input(self, page: Page, selector: str, value: str):
-        """Fill text input, handling hidden/disabled Ant Design inputs"""
+        # Plain inputs go last so dropdown postbacks can't wipe their values
+        if plain_fields:
+            await self._fill_plain_fields(page, plain_fields)
+
+    async def _fill_plain_fields(self, page: Page, fields: List[Tuple[str, str]]):
+        """Fill plain text/textarea/number inputs in a single round-trip"""
         try:
-            # First check if element is visible and enabled
-            is_fillable = await page.evaluate(
-                f"""
-                () => {{
-                    const el = document.querySelector('{selector}');
-                    if (!el) return {{ exists: false }};
-                    const style = window.getComputedStyle(el);
-                    return {{
-                        exists: true,
-                        visible: style.display !== 'none' && style.visibility !== 'hidden',
-                        enabled: !el.disabled && !el.readOnly,
-                        isHidden: el.type === 'hidden'
-                    }};
-                }}
-            """
+            missing = await page.evaluate(
+                """
+                (pairs) => {
+                    const missing = [];
+                    for (const [selector, value] of pairs) {
+                        let el;
+                        try {
+                            el = document.querySelector(selector);
+                        } catch (e) {
+                            el = null;
+                        }
+                        if (!el) {
+                            missing.push(selector);
+                            continue;
+                        }
+                        // Use the native setter so React-controlled inputs see the change
+                        const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+                            : el instanceof HTMLInputElement ? HTMLInputElement.prototype : null;
+                        const descriptor = proto && Object.getOwnPropertyDescriptor(proto, 'value');
+                        if (descriptor && descriptor.set) {
+                            descriptor.set.call(el, value);
+                        } else {
+                            el.value = value;
+                        }
+                        el.dispatchEvent(new Event('input', { bubbles: true }));
+                        el.dispatchEvent(new Event('change', { bubbles: true }));
+                    }
+                    return missing;
+                }
+            """,
+                fields,
             )
-
-            if not is_fillable.get("exists"):
+            for selector in missing:
                 logger.debug(f"Element {selector} not found")
-                return
-
-            if is_fillable.get("isHidden") or not is_fillable.get("visible"):
-                # Hidden input - set value via JS
-                await page.evaluate(
-                    f"""
-                    (value) => {{
-                        const el = document.querySelector('{selector}');
-                        if (el) {{
-                            el.value = value;
-                            el.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                            el.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                        }}
-                    }}
-                """,
-                    value,
-                )
-            elif is_fillable.get("enabled"):
-                await page.fill(selector, value, timeout=3000)
-            else:
-                # Disabled/readonly - try JS anyway
-                await page.evaluate(
-                    f"""
-                    (value) => {{
-                        const el = document.querySelector('{selector}');
-                        if (el) {{
-                            el.value = value;
-                            el.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                        }}
-                    }}
-                """,
-                    value,
-                )
         except Exception as e:
-            logger.debug(f"Text input fill failed for {selector}: {e}")
+            logger.warning(f"Could not fill text inputs: {e}")
 
     async def _fill_dropdown_universal(self, page: Page, field, value: str):
         """
@@ -877,44 +1050,49 @@ class TestValidationAgent(BaseAgent):
 
         # If type is plain_html (default) or unknown, try to detect it
         if not dropdown_type or dropdown_type == "plain_html":
-            dropdown_type = await page.evaluate(
-                f"""
-                () => {{
-                    const el = document.querySelector('{selector}');
-                    if (!el) return 'not_found';
+            dropdown_type = self._dropdown_types.get(selector)
+            if dropdown_type is None:
+                dropdown_type = await page.evaluate(
+                    """
+                    (selector) => {
+                        const el = document.querySelector(selector);
+                        if (!el) return 'not_found';
                     
-                    const allClasses = (el.className + ' ' + 
-                        (el.parentElement?.className || '') + ' ' +
-                        (el.parentElement?.parentElement?.className || '')).toLowerCase();
+                        const allClasses = (el.className + ' ' + 
+                            (el.parentElement?.className || '') + ' ' +
+                            (el.parentElement?.parentElement?.className || '')).toLowerCase();
                     
-                    // Ant Design detection (BEFORE Select2 - more specific)
-                    if (allClasses.includes('ant-select') || 
-                        el.classList.contains('ant-select-selection-search-input') ||
-                        el.closest('.ant-select')) {{
-                        return 'ant_design';
-                    }}
+                        // Ant Design detection (BEFORE Select2 - more specific)
+                        if (allClasses.includes('ant-select') || 
+                            el.classList.contains('ant-select-selection-search-input') ||
+                            el.closest('.ant-select')) {
+                            return 'ant_design';
+                        }
                     
-                    // Select2 detection
-                    if (allClasses.includes('select2') || 
-                        el.classList.contains('select2-hidden-accessible') ||
-                        document.querySelector(`[data-select2-id="${{el.id}}"]`)) {{
-                        return 'select2';
-                    }}
+                        // Select2 detection
+                        if (allClasses.includes('select2') || 
+                            el.classList.contains('select2-hidden-accessible') ||
+                            document.querySelector(`[data-select2-id="${el.id}"]`)) {
+                            return 'select2';
+                        }
                     
-                    // Check if it's a standard select
-                    if (el.tagName === 'SELECT') {{
-                        return 'plain_html';
-                    }}
+                        // Check if it's a standard select
+                        if (el.tagName === 'SELECT') {
+                            return 'plain_html';
+                        }
                     
-                    // Check for combobox role (common in custom dropdowns)
-                    if (el.getAttribute('role') === 'combobox') {{
-                        return 'combobox';
-                    }}
+                        // Check for combobox role (common in custom dropdowns)
+                        if (el.getAttribute('role') === 'combobox') {
+                            return 'combobox';
+                        }
                     
-                    return 'plain_html';
-                }}
-            """
-            )
+                        return 'plain_html';
+                    }
+                """,
+                    selector,
+                )
+                if dropdown_type != "not_found":
+                    self._dropdown_types[selector] = dropdown_type
 
         logger.debug(f"Dropdown {field.label} type: {dropdown_type} (from discovery: {field.dropdown_type})")
 
@@ -971,7 +1149,9 @@ class TestValidationAgent(BaseAgent):
             # CRITICAL: Use Playwright's native click, NOT JavaScript click
             # JavaScript click() doesn't trigger React's synthetic events
             await wrapper.click()
-            await asyncio.sleep(1.0)
+            await self._wait_for_selector_quietly(
+                page, ".ant-select-dropdown .ant-select-item-option", timeout=1000
+            )
 
             # Find visible dropdown and select option
             dropdown_visible = (
@@ -986,7 +1166,9 @@ class TestValidationAgent(BaseAgent):
                 await page.click(
                     f".ant-select:has({selector})", timeout=2000, force=True
                 )
-                await asyncio.sleep(0.8)
+                await self._wait_for_selector_quietly(
+                    page, ".ant-select-dropdown .ant-select-item-option", timeout=800
+                )
 
             # Find all visible dropdowns and get options
             options = page.locator(
@@ -1013,7 +1195,6 @@ class TestValidationAgent(BaseAgent):
                         ):
                             await opt.click()
                             logger.info(f"Selected {field_name}: {text}")
-                            await asyncio.sleep(0.5)
                             return True
                     except:
                         continue
@@ -1023,7 +1204,6 @@ class TestValidationAgent(BaseAgent):
                     first_text = await options.first.text_content()
                     await options.first.click()
                     logger.info(f"Selected {field_name} (fallback): {first_text}")
-                    await asyncio.sleep(0.5)
                     return True
                 except Exception as e:
                     logger.warning(f"{field_name}: Could not click first option: {e}")
@@ -1043,55 +1223,54 @@ class TestValidationAgent(BaseAgent):
         """Fill Select2 dropdown using jQuery"""
         try:
             result = await page.evaluate(
-                f"""
-                (value) => {{
-                    const select = document.querySelector('{selector}');
-                    if (!select || typeof $ === 'undefined') {{
-                        return {{ success: false, error: 'jQuery or element not found' }};
-                    }}
+                """
+                ([selector, value]) => {
+                    const select = document.querySelector(selector);
+                    if (!select || typeof $ === 'undefined') {
+                        return { success: false, error: 'jQuery or element not found' };
+                    }
                     
-                    try {{
+                    try {
                         const $select = $(select);
                         let optionValue = value;
                         
                         // Find option by value or text
                         const options = $select.find('option');
-                        options.each(function() {{
+                        options.each(function() {
                             if (this.value === value || 
-                                this.text.toLowerCase().includes(value.toLowerCase())) {{
+                                this.text.toLowerCase().includes(value.toLowerCase())) {
                                 optionValue = this.value;
                                 return false;
-                            }}
-                        }});
+                            }
+                        });
                         
                         // Fallback: first non-empty option
-                        if (!optionValue && options.length > 1) {{
-                            for (let i = 0; i < options.length; i++) {{
-                                if (options[i].value && options[i].value !== '') {{
+                        if (!optionValue && options.length > 1) {
+                            for (let i = 0; i < options.length; i++) {
+                                if (options[i].value && options[i].value !== '') {
                                     optionValue = options[i].value;
                                     break;
-                                }}
-                            }}
-                        }}
+                                }
+                            }
+                        }
                         
                         $select.val(optionValue);
                         $select.trigger('change');
                         $select.trigger('change.select2');
                         
-                        return {{ success: true, selectedValue: optionValue }};
-                    }} catch (e) {{
-                        return {{ success: false, error: e.message }};
-                    }}
-                }}
+                        return { success: true, selectedValue: optionValue };
+                    } catch (e) {
+                        return { success: false, error: e.message };
+                    }
+                }
             """,
-                value,
+                [selector, value],
             )
 
             if result.get("success"):
                 logger.info(
                     f"Selected {field_name} (Select2): {result.get('selectedValue')}"
                 )
-                await asyncio.sleep(1)
                 return True
             else:
                 logger.warning(
@@ -1126,16 +1305,17 @@ class TestValidationAgent(BaseAgent):
 
             # Try partial match
             options = await page.evaluate(
-                f"""
-                () => {{
-                    const select = document.querySelector('{selector}');
+                """
+                (selector) => {
+                    const select = document.querySelector(selector);
                     if (!select) return [];
-                    return Array.from(select.options).map(o => ({{
+                    return Array.from(select.options).map(o => ({
                         value: o.value,
                         text: o.text
-                    }}));
-                }}
-            """
+                    }));
+                }
+            """,
+                selector,
             )
 
             for opt in options:
@@ -1168,64 +1348,54 @@ class TestValidationAgent(BaseAgent):
             await ai_discovery.generate_test_data_with_ai(page, fields)
         This method provides a fallback when page context isn't available.
         """
-        data = {}
-
-        for field in schema.fields:
-            if exclude_field and field.name == exclude_field:
-                continue
-
-            if not field.required and exclude_field:
-                continue  # Skip optional fields when testing required
+        return {
+            field.name: self._field_generator(field)()
+            for field in schema.fields
+            if not exclude_field
+            # Skip the excluded field and optional fields when testing required
+            or (field.required and field.name != exclude_field)
+        }
 
-            # For dropdowns, use first available option
+    def _field_generator(self, field: FormField) -> Callable[[], str]:
+        """Pick the test value generator for a field once and reuse it"""
+        key = (field.name, field.type)
+        generator = self._field_generators.get(key)
+        if generator is None:
             if field.type == "dropdown" and field.options:
-                data[field.name] = field.options[0] if field.options else ""
+                # For dropdowns, use first available option
+                option = field.options[0]
+                generator = lambda: option
             elif field.type == "textarea":
-                data[field.name] = "This is a test complaint for automated testing purposes."
+                generator = lambda: TEXTAREA_TEST_VALUE
             else:
-                # Generic fallback - AI will generate better data when available
-                data[field.name] = "Test Value"
-
-        return data
+                generator = lambda: DEFAULT_TEST_VALUE
+            self._field_generators[key] = generator
+        return generator
 
-    async def _extract_tracking_id(self, page: Page, page_text: str) -> Optional[str]:
+    async def _extract_tracking_id(self, page: Page) -> Optional[str]:
         """Try to extract tracking/complaint ID from success page"""
-        import re
-
-        # Common patterns for tracking IDs
-        patterns = [
-            r"complaint\s*(?:id|number|no\.?)\s*:?\s*([A-Z0-9-]+)",
-            r"tracking\s*(?:id|number|no\.?)\s*:?\s*([A-Z0-9-]+)",
-            r"reference\s*(?:id|number|no\.?)\s*:?\s*([A-Z0-9-]+)",
-            r"([A-Z]{2,5}\d{5,10})",  # Generic pattern like RMC12345
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, page_text, re.IGNORECASE)
-            if match:
-                return match.group(1)
-
-        return None
+        # Scan the body text in the browser so only the match crosses CDP
+        return await page.evaluate(
+            """
+            (patterns) => {
+                const text = document.body ? document.body.innerText : '';
+                for (const source of patterns) {
+                    const match = text.match(new RegExp(source, 'i'));
+                    if (match) return match[1];
+                }
+                return null;
+            }
+        """,
+            list(_TRACKING_PATTERNS),
+        )
 
     def _dict_to_schema(self, schema_dict: Dict[str, Any]) -> FormSchema:
         """Convert dict back to FormSchema object"""
-        fields = []
-        for field_data in schema_dict.get("fields", []):
-            field = FormField(
-                name=field_data["name"],
-                label=field_data["label"],
-                type=field_data["type"],
-                selector=field_data["selector"],
-                required=field_data.get("required", False),
-                placeholder=field_data.get("placeholder", ""),
-                options=field_data.get("options", []),
-                depends_on=field_data.get("depends_on"),
-                validation_pattern=field_data.get("validation_pattern"),
-                error_message=field_data.get("error_message"),
-                dropdown_type=field_data.get("dropdown_type", "plain_html"),
-                interaction_code=field_data.get("interaction_code"),
-            )
-            fields.append(field)
+        # Unknown keys are dropped; missing optional keys take the dataclass defaults
+        fields = [
+            FormField(**{k: v for k, v in field_data.items() if k in _FORM_FIELD_KEYS})
+            for field_data in schema_dict.get("fields", [])
+        ]
 
         schema = FormSchema(
             url=schema_dict["url"],
@@ -1338,12 +1508,12 @@ async def _interaction_func(page, value):
         
         # Get current HTML context for debugging
         try:
-            html_context = await page.evaluate(f"""
-                () => {{
-                    const el = document.querySelector('{field.selector}');
+            html_context = await page.evaluate("""
+                (selector) => {
+                    const el = document.querySelector(selector);
                     return el ? el.outerHTML : 'Element not found in DOM';
-                }}
-            """)
+                }
+            """, field.selector)
         except:
             html_context = "Could not retrieve HTML"
 
@@ -1382,7 +1552,6 @@ Return ONLY the fixed python code block.
             )
             
             content = response.content[0].text
-            import re
             match = re.search(r"```python\s*(.*?)\s*```", content, re.DOTALL)
             if match:
                 return match.group(1).strip()
@@ -1438,12 +1607,14 @@ async def test_validation():
     }
 
     agent = TestValidationAgent(headless=False)
-    result = await agent.execute({"schema": mock_schema})
+    try:
+        result = await agent.execute({"schema": mock_schema})
+    finally:
+        await TestValidationAgent.shutdown()
 
     print(json.dumps(result, indent=2, default=str))
 
 
 if __name__ == "__main__":
-    import json
     asyncio.run(test_validation())
 
@@ -87,6 +87,9 @@ class BatchProcessor:
 
         self.progress: Optional[BatchProgress] = None
         self.jobs: List[BatchJob] = []
+        # Orchestrators created during the current batch (their session files are
+        # flushed to disk once the batch ends)
+        self._orchestrators: List[Orchestrator] = []
 
         # Results directory
         self.results_dir = Path("batch_results")
@@ -145,7 +148,15 @@ class BatchProcessor:
 
         # Run all jobs
         tasks = [process_job_with_semaphore(job) for job in self.jobs]
-        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            # Persist the session files written during the batch, then release
+            # browsers (shared between jobs, so only once every job is done)
+            for orchestrator in self._orchestrators:
+                await asyncio.to_thread(orchestrator.flush_sessions)
+                await orchestrator.aclose()
+            self._orchestrators.clear()
 
         # Finalize
         self.progress.end_time = datetime.now()
@@ -180,6 +191,7 @@ class BatchProcessor:
                     headless=self.headless,
                     dashboard_enabled=self.dashboard_enabled
                 )
+                self._orchestrators.append(orchestrator)
 
                 # Run training
                 result = await orchestrator.train_municipality(
@@ -16,6 +16,7 @@ Commands:
 import argparse
 import asyncio
 import json
+import logging
 import sys
 from pathlib import Path
 from typing import Optional
@@ -582,6 +583,9 @@ Examples:
         parser.print_help()
         return 0
 
+    # The validator reports its progress (attempts, fixes, results) via logging
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # Route to command handler
     commands = {
         "discover": cmd_discover,
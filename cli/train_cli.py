@@ -130,10 +130,13 @@ Examples:
     )
 
     # Run training
-    result = await orchestrator.train_municipality(
-        url=url,
-        municipality=municipality
-    )
+    try:
+        result = await orchestrator.train_municipality(
+            url=url,
+            municipality=municipality
+        )
+    finally:
+        await orchestrator.aclose()
 
     # Display results
     print("\n" + "="*80)
@@ -393,6 +393,7 @@ class GrivredrTUI:
                 session_info=session_info,
             )
 
+            orchestrator = None
             try:
                 # Create orchestrator with callbacks
                 orchestrator = Orchestrator()
@@ -435,6 +436,10 @@ class GrivredrTUI:
 
                 state.log(f"Training failed: {e}", "error")
 
+            finally:
+                if orchestrator is not None:
+                    await orchestrator.aclose()
+
         # Show final results
         self.show_training_results()
 
@@ -449,8 +454,9 @@ class GrivredrTUI:
         async def on_phase_complete(phase_name: str, result: Dict[str, Any]):
             state.log(f"Completed phase: {phase_name}", "info")
 
-        async def on_agent_action(agent_name: str, action: Any):
-            state.log(f"{agent_name}: {action.description[:50]}...", "debug")
+        async def on_agent_action(agent_name: str, actions: List[Dict[str, Any]]):
+            for action in actions:
+                state.log(f"{agent_name}: {action['description'][:50]}...", "debug")
 
         async def on_error(phase: str, error: str, details: Optional[str] = None):
             state.add_error(error, phase, details)
@@ -144,6 +144,8 @@ async def test_ranchi_training():
         return False
 
     finally:
+        # Release the shared validation browser and driver
+        await orchestrator.aclose()
         print(f"\n⏱️  Completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("="*80)
 
@@ -46,8 +46,10 @@ setup(
         "python-dotenv>=1.0.1",
         "pydantic>=2.6.0",
         "pydantic-settings>=2.1.0",
+        "orjson>=3.9.0",
         "aiofiles>=23.2.1",
         "httpx>=0.26.0",
+        'uvloop>=0.19.0; sys_platform != "win32"',
         "sqlalchemy>=2.0.25",
         "pillow>=10.3.0",
         "jinja2>=3.1.3",
@@ -0,0 +1,374 @@
+"""
+Unit tests for Orchestrator session event logs and UI dispatch
+"""
+
+import pytest
+import asyncio
+from datetime import datetime
+from unittest.mock import Mock, AsyncMock, patch
+
+import orjson
+
+from agents.orchestrator import Orchestrator, TrainingSession
+
+
+@pytest.fixture
+def orchestrator(tmp_path):
+    """Orchestrator writing its session files to a temp directory"""
+    orch = Orchestrator(headless=True, enable_hybrid_discovery=False)
+    orch.results_dir = tmp_path
+    return orch
+
+
+def make_session(session_id="test_muni_20250101_120000"):
+    return TrainingSession(
+        session_id=session_id,
+        municipality="test_muni",
+        url="https://example.com/form",
+        start_time=datetime(2025, 1, 1, 12, 0, 0),
+    )
+
+
+async def log_start(orchestrator, session):
+    await orchestrator._append_event(
+        session,
+        "start",
+        {
+            "municipality": session.municipality,
+            "url": session.url,
+            "start_time": session.start_iso,
+        },
+    )
+
+
+class TestSessionEventLog:
+    """Test the JSONL event log round trip"""
+
+    @pytest.mark.asyncio
+    async def test_append_event_writes_jsonl(self, orchestrator):
+        """Test each event is one JSON line"""
+        session = make_session()
+        await log_start(orchestrator, session)
+        await orchestrator._append_event(session, "form_discovery", {"success": True})
+
+        lines = (
+            orchestrator._event_log_path(session.session_id).read_bytes().splitlines()
+        )
+        assert [orjson.loads(line)["event"] for line in lines] == [
+            "start",
+            "form_discovery",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_restore_after_start_only(self, orchestrator):
+        """Test a session that crashed before any phase resumes from discovery"""
+        session = make_session()
+        await log_start(orchestrator, session)
+
+        restored = Orchestrator(headless=True, enable_hybrid_discovery=False)
+        restored.results_dir = orchestrator.results_dir
+
+        assert restored.restore_unfinished_sessions() == [session.session_id]
+        rebuilt = restored.sessions[session.session_id]
+        assert rebuilt.status == "interrupted"
+        assert rebuilt.municipality == "test_muni"
+        assert rebuilt.url == "https://example.com/form"
+        assert rebuilt.start_time == session.start_time
+        assert rebuilt.discovery_result is None
+
+    @pytest.mark.asyncio
+    async def test_restore_completed_phases(self, orchestrator):
+        """Test completed phase results are restored with their extracted parts"""
+        session = make_session()
+        await log_start(orchestrator, session)
+        await orchestrator._append_event(
+            session, "form_discovery", {"success": True, "schema": {"fields": []}}
+        )
+        await orchestrator._append_event(
+            session, "js_analysis", {"success": True, "analysis": {"frameworks": []}}
+        )
+
+        assert orchestrator.restore_unfinished_sessions() == [session.session_id]
+        rebuilt = orchestrator.sessions[session.session_id]
+        assert rebuilt.schema == {"fields": []}
+        assert rebuilt.js_analysis == {"frameworks": []}
+        assert rebuilt.test_result is None
+
+    @pytest.mark.asyncio
+    async def test_restore_ignores_truncated_last_line(self, orchestrator):
+        """Test a partially written last line (crash mid-append) is dropped"""
+        session = make_session()
+        await log_start(orchestrator, session)
+        await orchestrator._append_event(
+            session, "form_discovery", {"success": True, "schema": {"fields": []}}
+        )
+        log_file = orchestrator._event_log_path(session.session_id)
+        with open(log_file, "ab") as f:
+            f.write(b'{"event": "js_analysis", "data": {"succ')
+
+        assert orchestrator.restore_unfinished_sessions() == [session.session_id]
+        rebuilt = orchestrator.sessions[session.session_id]
+        assert rebuilt.discovery_result is not None
+        assert rebuilt.js_analysis_result is None
+
+    @pytest.mark.asyncio
+    async def test_restore_skips_finalized_sessions(self, orchestrator):
+        """Test logs with a saved .json next to them are not restored"""
+        session = make_session()
+        await log_start(orchestrator, session)
+        (orchestrator.results_dir / f"{session.session_id}.json").write_bytes(b"{}")
+
+        assert orchestrator.restore_unfinished_sessions() == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status", ["aborted", "failed", "rejected"])
+    async def test_restore_skips_terminal_sessions(self, orchestrator, status):
+        """Test logs ending in a finish event are not restored"""
+        session = make_session()
+        await log_start(orchestrator, session)
+        await orchestrator._append_event(session, "finish", {"status": status})
+
+        assert orchestrator.restore_unfinished_sessions() == []
+        assert session.session_id not in orchestrator.sessions
+
+    @pytest.mark.asyncio
+    async def test_failed_training_records_finish_event(self, orchestrator):
+        """Test a training that raises is logged as finished and not restored"""
+        with patch.object(
+            orchestrator,
+            "_run_form_discovery",
+            AsyncMock(side_effect=RuntimeError("browser crashed")),
+        ):
+            result = await orchestrator.train_municipality(
+                "https://example.com/form", "test_muni"
+            )
+
+        assert result["success"] is False
+        lines = (
+            orchestrator._event_log_path(result["session_id"])
+            .read_bytes()
+            .splitlines()
+        )
+        assert orjson.loads(lines[-1]) == {
+            "event": "finish",
+            "data": {"status": "failed"},
+        }
+        assert orchestrator.restore_unfinished_sessions() == []
+
+    @pytest.mark.asyncio
+    async def test_failed_js_analysis_cancels_validation(self, orchestrator):
+        """Test validation stops when the concurrent JS analysis raises"""
+        validation_cancelled = False
+
+        async def run_validation(session):
+            nonlocal validation_cancelled
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                validation_cancelled = True
+                raise
+
+        with patch.object(
+            orchestrator,
+            "_run_form_discovery",
+            AsyncMock(return_value={"success": True, "schema": {"fields": []}}),
+        ), patch.object(
+            orchestrator,
+            "_run_js_analysis",
+            AsyncMock(side_effect=RuntimeError("analysis crashed")),
+        ), patch.object(
+            orchestrator, "_run_validation_tests", run_validation
+        ):
+            result = await orchestrator.train_municipality(
+                "https://example.com/form", "test_muni"
+            )
+
+        assert result["success"] is False
+        assert validation_cancelled
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "events, start_phase",
+        [
+            ([], "form_discovery"),
+            (["form_discovery"], "js_analysis"),
+            (["form_discovery", "js_analysis"], "js_analysis"),
+            (["form_discovery", "js_analysis", "test_validation"], "code_generation"),
+        ],
+    )
+    async def test_resume_training_start_phase(self, orchestrator, events, start_phase):
+        """Test resume_training continues at the first incomplete phase"""
+        session = make_session()
+        await log_start(orchestrator, session)
+        for event in events:
+            await orchestrator._append_event(session, event, {"success": True})
+        orchestrator.restore_unfinished_sessions()
+
+        with patch.object(
+            orchestrator, "_run_phases", AsyncMock(return_value={"success": True})
+        ) as run_phases:
+            result = await orchestrator.resume_training(session.session_id)
+
+        assert result == {"success": True}
+        restored = orchestrator.sessions[session.session_id]
+        run_phases.assert_awaited_once_with(restored, start_phase=start_phase)
+        assert restored.status == "in_progress"
+
+
+class TestFinalizeSession:
+    """Test saving and shrinking a completed session"""
+
+    @pytest.mark.asyncio
+    async def test_hints_with_non_json_values_are_saved(self, orchestrator):
+        """Test free-form human hints do not break the session file"""
+        session = make_session()
+        session.code_gen_result = {"success": True, "scraper": {"file_path": "s.py"}}
+        session.human_corrections.append(
+            {"phase": "form_discovery", "feedback": "retry", "hints": {1: {"a"}}}
+        )
+
+        result = await orchestrator._finalize_session(session)
+
+        session_file = orchestrator.results_dir / f"{session.session_id}.json"
+        saved = orjson.loads(session_file.read_bytes())
+        assert saved["human_corrections"][0]["hints"] == {"1": "{'a'}"}
+        assert result["scraper_path"] == "s.py"
+
+    def test_shrink_keeps_summary_keys(self, orchestrator):
+        """Test readers of a trained session still find its summary"""
+        session = make_session()
+        session.discovery_result = {
+            "success": True,
+            "schema": {"fields": [{"label": "Name", "type": "text", "selector": "#n"}]},
+        }
+        session.test_result = {"success": True, "confidence_score": 0.9}
+        session.code_gen_result = {
+            "success": True,
+            "scraper": {"file_path": "s.py", "validation_passed": True, "code": "..."},
+        }
+
+        orchestrator._shrink_session(session)
+
+        assert session.discovery_result["schema"]["fields"] == [
+            {"label": "Name", "type": "text"}
+        ]
+        assert session.test_result["confidence_score"] == 0.9
+        assert session.code_gen_result["scraper"] == {
+            "file_path": "s.py",
+            "validation_passed": True,
+        }
+
+
+class TestUIDispatcher:
+    """Test coalescing and batching of queued UI events"""
+
+    @pytest.mark.asyncio
+    async def test_keyed_events_coalesce_to_latest(self, orchestrator):
+        """Test pending events with the same key collapse to the last one"""
+        delivered = []
+
+        async def on_status(agent_name, status):
+            delivered.append((agent_name, status))
+
+        for status in ("thinking", "acting", "success"):
+            orchestrator._dispatch_ui(("status", "agent_a"), on_status, "agent_a", status)
+        orchestrator._dispatch_ui(("status", "agent_b"), on_status, "agent_b", "idle")
+        await orchestrator._ui_queue.join()
+
+        assert delivered == [("agent_a", "success"), ("agent_b", "idle")]
+        await orchestrator.aclose()
+
+    @pytest.mark.asyncio
+    async def test_unkeyed_events_are_all_delivered(self, orchestrator):
+        """Test events without a key are never coalesced"""
+        delivered = []
+
+        async def on_update(value):
+            delivered.append(value)
+
+        for value in range(3):
+            orchestrator._dispatch_ui(None, on_update, value)
+        await orchestrator._ui_queue.join()
+
+        assert delivered == [0, 1, 2]
+        await orchestrator.aclose()
+
+    @pytest.mark.asyncio
+    async def test_actions_are_batched_per_agent(self, orchestrator):
+        """Test consecutive actions of one agent are delivered as one list"""
+        delivered = []
+
+        async def on_action(agent_name, actions):
+            delivered.append((agent_name, actions))
+
+        for n in range(3):
+            orchestrator._dispatch_ui(("action", "agent_a"), on_action, "agent_a", n)
+        orchestrator._dispatch_ui(("action", "agent_b"), on_action, "agent_b", 3)
+        orchestrator._dispatch_ui(("action", "agent_a"), on_action, "agent_a", 4)
+        await orchestrator._ui_queue.join()
+
+        assert delivered == [
+            ("agent_a", [0, 1, 2]),
+            ("agent_b", [3]),
+            ("agent_a", [4]),
+        ]
+        await orchestrator.aclose()
+
+    @pytest.mark.asyncio
+    async def test_action_batches_are_capped(self, orchestrator):
+        """Test batches are split at ACTION_BATCH_SIZE"""
+        orchestrator.ACTION_BATCH_SIZE = 2
+        delivered = []
+
+        async def on_action(agent_name, actions):
+            delivered.append(actions)
+
+        for n in range(5):
+            orchestrator._dispatch_ui(("action", "agent_a"), on_action, "agent_a", n)
+        await orchestrator._ui_queue.join()
+
+        assert delivered == [[0, 1], [2, 3], [4]]
+        await orchestrator.aclose()
+
+    @pytest.mark.asyncio
+    async def test_agent_action_callback_delivers_list(self, orchestrator):
+        """Test on_agent_action receives a list even for a single action"""
+        orchestrator.on_agent_action = AsyncMock()
+        action = Mock(
+            action_type="click", description="Click submit", result="ok", cost=0.01
+        )
+
+        await orchestrator._agent_action_callback("agent_a", action)
+        await orchestrator._ui_queue.join()
+
+        orchestrator.on_agent_action.assert_awaited_once_with(
+            "agent_a",
+            [
+                {
+                    "type": "click",
+                    "description": "Click submit",
+                    "result": "ok",
+                    "cost": 0.01,
+                }
+            ],
+        )
+        await orchestrator.aclose()
+
+    @pytest.mark.asyncio
+    async def test_callback_errors_do_not_stop_dispatcher(self, orchestrator):
+        """Test a failing callback is logged and later events still arrive"""
+        delivered = []
+
+        async def failing(value):
+            raise ValueError("UI gone")
+
+        async def on_update(value):
+            delivered.append(value)
+
+        orchestrator._dispatch_ui(None, failing, 0)
+        orchestrator._dispatch_ui(None, on_update, 1)
+        await orchestrator._ui_queue.join()
+
+        assert delivered == [1]
+        assert not orchestrator._ui_task.done()
+        await orchestrator.aclose()
@@ -0,0 +1,159 @@
+"""
+Unit tests for CodeCorrectionAgent fix caching and ScreenshotVerifier answers
+"""
+
+import pytest
+import asyncio
+from unittest.mock import Mock, AsyncMock, patch
+
+from agents.scraper_validator import CodeCorrectionAgent, FixResult, ScreenshotVerifier
+
+
+FIX_REQUEST = {
+    "current_code": "class Scraper:\n    pass\n",
+    "error": "Timeout 30000ms exceeded",
+    "error_type": "TimeoutError",
+    "stack_trace": "Traceback (most recent call last):\n  ...",
+}
+
+
+@pytest.fixture
+def corrector():
+    """CodeCorrectionAgent with no real API client"""
+    return CodeCorrectionAgent(client=Mock(), cost_tracker=Mock())
+
+
+class TestFixCache:
+    """Test reuse and eviction of cached fix requests"""
+
+    @pytest.mark.asyncio
+    async def test_successful_fix_is_reused(self, corrector):
+        """Test identical requests hit the API once and repeats cost nothing"""
+        fix = FixResult(success=True, new_code="fixed = True\n", cost=0.05)
+        with patch.object(
+            corrector, "_request_fix", AsyncMock(return_value=fix)
+        ) as request_fix:
+            first = await corrector.fix_code(**FIX_REQUEST)
+            await asyncio.sleep(0)
+            second = await corrector.fix_code(**FIX_REQUEST)
+
+        assert request_fix.await_count == 1
+        assert first.cost == 0.05
+        assert second.new_code == "fixed = True\n"
+        assert second.cost == 0.0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_share_request(self, corrector):
+        """Test duplicates issued while the first is pending share its result"""
+        fix = FixResult(success=True, new_code="fixed = True\n", cost=0.05)
+        with patch.object(
+            corrector, "_request_fix", AsyncMock(return_value=fix)
+        ) as request_fix:
+            results = await asyncio.gather(
+                corrector.fix_code(**FIX_REQUEST), corrector.fix_code(**FIX_REQUEST)
+            )
+
+        assert request_fix.await_count == 1
+        assert sorted(r.cost for r in results) == [0.0, 0.05]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_duplicates(self, corrector):
+        """Test cancelling one caller leaves the shared request running"""
+        fix = FixResult(success=True, new_code="fixed = True\n", cost=0.05)
+        released = asyncio.Event()
+
+        async def request_fix(*args):
+            await released.wait()
+            return fix
+
+        with patch.object(corrector, "_request_fix", request_fix):
+            first = asyncio.create_task(corrector.fix_code(**FIX_REQUEST))
+            second = asyncio.create_task(corrector.fix_code(**FIX_REQUEST))
+            await asyncio.sleep(0)
+            first.cancel()
+            released.set()
+            result = await second
+
+        assert first.cancelled()
+        assert result.new_code == "fixed = True\n"
+
+    @pytest.mark.asyncio
+    async def test_different_requests_are_not_shared(self, corrector):
+        """Test a different error produces a new request"""
+        fix = FixResult(success=True, new_code="fixed = True\n")
+        with patch.object(
+            corrector, "_request_fix", AsyncMock(return_value=fix)
+        ) as request_fix:
+            await corrector.fix_code(**FIX_REQUEST)
+            await corrector.fix_code(**{**FIX_REQUEST, "error": "Element not found"})
+
+        assert request_fix.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_unsuccessful_fix_is_evicted(self, corrector):
+        """Test a fix with success=False is retried instead of replayed"""
+        failed = FixResult(success=False, reasoning="AI generated code with syntax error")
+        fixed = FixResult(success=True, new_code="fixed = True\n")
+        with patch.object(
+            corrector, "_request_fix", AsyncMock(side_effect=[failed, fixed])
+        ) as request_fix:
+            first = await corrector.fix_code(**FIX_REQUEST)
+            await asyncio.sleep(0)
+            second = await corrector.fix_code(**FIX_REQUEST)
+
+        assert request_fix.await_count == 2
+        assert first.success is False
+        assert second.success is True
+        assert len(corrector._fix_cache) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_request_is_evicted(self, corrector):
+        """Test a request that raised is retried instead of replayed"""
+        fixed = FixResult(success=True, new_code="fixed = True\n")
+        with patch.object(
+            corrector,
+            "_request_fix",
+            AsyncMock(side_effect=[RuntimeError("API unavailable"), fixed]),
+        ) as request_fix:
+            with pytest.raises(RuntimeError):
+                await corrector.fix_code(**FIX_REQUEST)
+            await asyncio.sleep(0)
+            second = await corrector.fix_code(**FIX_REQUEST)
+
+        assert request_fix.await_count == 2
+        assert second.success is True
+
+    @pytest.mark.asyncio
+    async def test_cache_is_bounded(self, corrector):
+        """Test the oldest entries are dropped past FIX_CACHE_SIZE"""
+        corrector.FIX_CACHE_SIZE = 2
+        fix = FixResult(success=True, new_code="fixed = True\n")
+        with patch.object(corrector, "_request_fix", AsyncMock(return_value=fix)):
+            for n in range(3):
+                await corrector.fix_code(**{**FIX_REQUEST, "error": f"error {n}"})
+
+        assert len(corrector._fix_cache) == 2
+
+
+class TestScreenshotVerifier:
+    """Test per-question answers of the batched form-state check"""
+
+    @pytest.mark.asyncio
+    async def test_results_are_tagged_by_check(self):
+        """Test the error question is identified by its check, not its position"""
+        verifier = ScreenshotVerifier(client=Mock(), cost_tracker=Mock())
+        verifier._ask = AsyncMock(
+            return_value='{"results": ['
+            '{"idx": 1, "answer": "yes", "observation": "filled"},'
+            '{"idx": 2, "answer": "yes", "observation": "Name is required"}]}'
+        )
+
+        verification = await verifier.verify_form_state(
+            "", {"fields_filled": ["name"], "no_errors": True}
+        )
+
+        assert [(r["check"], r["answer"]) for r in verification["results"]] == [
+            ("fields_filled", "yes"),
+            ("no_errors", "yes"),
+        ]
+        assert verification["issues_detected"] == []